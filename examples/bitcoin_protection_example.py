@@ -8,17 +8,20 @@ This example shows how to:
 4. Handle multiple wallets and cross-verification
 """
 
+from dataclasses import replace
+
 from src.bitcoin_protection import QuantumProtectedWallet
 
 def main():
-    print("Creating Alice's hybrid wallet...")
-    alice_wallet = QuantumProtectedWallet()
+    print("Creating hybrid wallets for Alice and Bob...")
+    alice_wallet, bob_wallet = QuantumProtectedWallet.create_many(2)
+    
+    print("\nAlice's hybrid wallet:")
     alice_info = alice_wallet.get_public_info()
     print(f"Alice's Bitcoin address: {alice_info['btc_address']}")
     print(f"Alice's quantum public key: {alice_info['quantum_public_key'][:32]}...")
     
-    print("\nCreating Bob's hybrid wallet...")
-    bob_wallet = QuantumProtectedWallet()
+    print("\nBob's hybrid wallet:")
     bob_info = bob_wallet.get_public_info()
     print(f"Bob's Bitcoin address: {bob_info['btc_address']}")
     print(f"Bob's quantum public key: {bob_info['quantum_public_key'][:32]}...")
@@ -40,9 +43,9 @@ def main():
     
     # Demonstrate tampering detection
     print("\nDemonstrating tampering detection...")
-    # Modify the transaction hash (simulating an attack)
-    protected_tx.tx_hash = "0" * 64
-    is_valid = bob_wallet.verify_protected_transaction(protected_tx)
+    # Swap in a different transaction hash (simulating an attack)
+    tampered_tx = replace(protected_tx, tx_hash="0" * 64)
+    is_valid = bob_wallet.verify_protected_transaction(tampered_tx)
     print(f"Verification of tampered transaction: {'Valid' if is_valid else 'Invalid'}")
     
     print("\nKey takeaways:")
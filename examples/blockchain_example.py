@@ -18,15 +18,45 @@ The example shows how to:
 
 import json
 import hashlib
-from dataclasses import dataclass
-from datetime import datetime
+import itertools
+import multiprocessing
+import queue
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 import base64
 import os
+import time
+from collections import OrderedDict
 
-from src.kyber import generate_keys as kyber_keygen, encapsulate, decapsulate
-from src.dilithium import generate_keys as dilithium_keygen, sign, verify
-from src.utils import secure_random_bytes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from src.kyber import (
+    generate_keys as kyber_keygen,
+    generate_keys_batch as kyber_keygen_batch,
+    encapsulate,
+    decapsulate
+)
+from src.dilithium import (
+    generate_keys as dilithium_keygen,
+    generate_keys_batch as dilithium_keygen_batch,
+    sign,
+    verify
+)
+
+def _dumps(obj) -> bytes:
+    """
+    Encode obj as compact, sorted-key UTF-8 JSON.
+    
+    Always uses the stdlib encoder: these bytes are hashed and signed,
+    and orjson formats floats differently (1e-8 rather than 1e-08), so
+    using it where installed would make hashes depend on the machine.
+    """
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False).encode()
+
+# Transaction fields covered by serialize() and therefore by the signature
+_SIGNED_FIELDS = frozenset(('sender', 'recipient', 'amount', 'timestamp'))
+# Transaction fields included in a block's serialized form
+_BLOCK_FIELDS = _SIGNED_FIELDS | {'signature'}
 
 @dataclass
 class QuantumResistantTransaction:
@@ -36,29 +66,60 @@ class QuantumResistantTransaction:
     Features:
     - Dilithium signatures for transaction authenticity
     - Transaction hash for integrity
-    - Timestamp for ordering
+    - Timestamp (nanoseconds since the epoch) for ordering
     """
-    sender: str
-    recipient: str
+    sender: bytes
+    recipient: bytes
     amount: float
-    timestamp: str = datetime.utcnow().isoformat()
+    timestamp: int = field(default_factory=time.time_ns)
     signature: Optional[bytes] = None
     sender_public_key: Optional[bytes] = None
     
+    def __setattr__(self, name, value):
+        # Drop cached encodings whenever a field they cover changes
+        if name in _SIGNED_FIELDS:
+            self.__dict__.pop('_serialized', None)
+            self.__dict__.pop('_hash', None)
+        if name in _BLOCK_FIELDS:
+            self.__dict__.pop('_block_entry', None)
+        object.__setattr__(self, name, value)
+    
     def serialize(self) -> bytes:
         """Serialize transaction for signing/verification."""
-        data = {
-            'sender': self.sender,
-            'recipient': self.recipient,
-            'amount': self.amount,
-            'timestamp': self.timestamp
-        }
-        return json.dumps(data, sort_keys=True).encode()
+        serialized = self.__dict__.get('_serialized')
+        if serialized is None:
+            data = {
+                'sender': self.sender.hex(),
+                'recipient': self.recipient.hex(),
+                'amount': self.amount,
+                'timestamp': self.timestamp
+            }
+            serialized = _dumps(data)
+            self.__dict__['_serialized'] = serialized
+        return serialized
     
     @property
     def hash(self) -> str:
         """Compute transaction hash."""
-        return hashlib.sha256(self.serialize()).hexdigest()
+        tx_hash = self.__dict__.get('_hash')
+        if tx_hash is None:
+            tx_hash = hashlib.sha256(self.serialize()).hexdigest()
+            self.__dict__['_hash'] = tx_hash
+        return tx_hash
+    
+    def block_entry(self) -> Dict:
+        """Get the JSON-ready representation used in block serialization."""
+        entry = self.__dict__.get('_block_entry')
+        if entry is None:
+            entry = {
+                'sender': self.sender.hex(),
+                'recipient': self.recipient.hex(),
+                'amount': self.amount,
+                'timestamp': self.timestamp,
+                'signature': base64.b64encode(self.signature).decode() if self.signature else None
+            }
+            self.__dict__['_block_entry'] = entry
+        return entry
     
     @classmethod
     def verify_transaction(cls, transaction: 'QuantumResistantTransaction') -> bool:
@@ -77,14 +138,63 @@ class QuantumResistantTransaction:
             if not hasattr(transaction, 'sender_public_key'):
                 return False
             
+            # Hash the cached payload in place rather than copying it
             return verify(
                 transaction.sender_public_key,
-                transaction.serialize(),
+                memoryview(transaction.serialize()),
                 transaction.signature
             )
         except Exception:
             return False
 
+# Largest difficulty a SHA-256 digest can meet: 64 hex digits
+MAX_DIFFICULTY = 64
+
+def _check_difficulty(difficulty: int):
+    """Raise ValueError unless difficulty is an int in [0, MAX_DIFFICULTY]."""
+    if (not isinstance(difficulty, int) or isinstance(difficulty, bool)
+            or not 0 <= difficulty <= MAX_DIFFICULTY):
+        raise ValueError(
+            f"difficulty must be an integer between 0 and {MAX_DIFFICULTY}"
+        )
+
+def _search_nonce(header, start: int, difficulty: int, step: int = 1) -> int:
+    """
+    Find the first nonce in start, start + step, ... whose block hash has
+    the required number of leading zeros.
+    
+    Args:
+        header: SHA-256 state over the serialized block header
+        start: First nonce to try
+        difficulty: Number of leading zero hex digits required
+        step: Distance between consecutive nonces tried
+    
+    Returns:
+        int: The winning nonce
+    """
+    # A digest has `difficulty` leading zero hex digits exactly when it
+    # is below 2^(256 - 4*difficulty) as a big-endian integer
+    threshold = 1 << (256 - 4 * difficulty)
+    copy_header = header.copy
+    from_bytes = int.from_bytes
+    for nonce in itertools.count(start, step):
+        h = copy_header()
+        h.update(b'%d}' % nonce)
+        if from_bytes(h.digest(), 'big') < threshold:
+            return nonce
+
+def _mine_worker(header: bytes, start: int, step: int, difficulty: int, found):
+    """
+    Search one stride of the nonce space and report the nonce found.
+    
+    An exception raised by the search is reported in place of the nonce,
+    so the parent never waits for a worker that has already died.
+    """
+    try:
+        found.put(_search_nonce(hashlib.sha256(header), start, difficulty, step))
+    except Exception as e:
+        found.put(e)
+
 @dataclass
 class QuantumResistantBlock:
     """
@@ -93,47 +203,174 @@ class QuantumResistantBlock:
     Features:
     - List of quantum-resistant transactions
     - Previous block hash for chain integrity
+    - Block height giving the block's position in the chain
     - Block hash using quantum-resistant data
     """
     transactions: List[QuantumResistantTransaction]
     previous_hash: str
-    timestamp: str = datetime.utcnow().isoformat()
+    height: int = 0
     nonce: int = 0
     
+    def __setattr__(self, name, value):
+        # Drop the cached header state whenever a field it covers changes
+        if name in ('transactions', 'previous_hash', 'height'):
+            self.__dict__.pop('_prefix_hasher', None)
+        object.__setattr__(self, name, value)
+    
+    def _header_chunks(self, entries: List[Dict]):
+        """
+        Yield the serialized block header in pieces.
+        
+        The pieces join to the sorted-key JSON object of every block field
+        except the nonce, left open so the nonce can be appended as its
+        last key. Each transaction is encoded separately, so a large block
+        never has to be built as one string before hashing.
+        """
+        yield b'{"height":%d,"previous_hash":%s,"transactions":[' % (
+            self.height, _dumps(self.previous_hash))
+        for i, entry in enumerate(entries):
+            if i:
+                yield b','
+            yield _dumps(entry)
+        yield b'],"nonce":'
+    
+    def _serialize_header(self) -> bytes:
+        """Serialize every block field except the nonce, which goes last."""
+        entries = [tx.block_entry() for tx in self.transactions]
+        return b''.join(self._header_chunks(entries))
+    
+    def _header_hasher(self):
+        """
+        Get the SHA-256 state over the serialized block header.
+        
+        The state is cached together with the transaction entries it was
+        built from. A transaction drops its cached entry when it changes,
+        so comparing entries by identity detects edits to the list and to
+        the transactions in it.
+        """
+        entries = [tx.block_entry() for tx in self.transactions]
+        cached = self.__dict__.get('_prefix_hasher')
+        if (cached is None or len(cached[0]) != len(entries)
+                or any(old is not new for old, new in zip(cached[0], entries))):
+            hasher = hashlib.sha256()
+            for chunk in self._header_chunks(entries):
+                hasher.update(chunk)
+            cached = (entries, hasher)
+            self.__dict__['_prefix_hasher'] = cached
+        return cached[1]
+    
     def serialize(self) -> bytes:
         """Serialize block for hashing."""
-        data = {
-            'transactions': [
-                {
-                    'sender': tx.sender,
-                    'recipient': tx.recipient,
-                    'amount': tx.amount,
-                    'timestamp': tx.timestamp,
-                    'signature': tx.signature.hex() if tx.signature else None
-                }
-                for tx in self.transactions
-            ],
-            'previous_hash': self.previous_hash,
-            'timestamp': self.timestamp,
-            'nonce': self.nonce
-        }
-        return json.dumps(data, sort_keys=True).encode()
+        return self._serialize_header() + b'%d}' % self.nonce
     
     def compute_hash(self) -> str:
         """Compute block hash."""
-        return hashlib.sha256(self.serialize()).hexdigest()
+        h = self._header_hasher().copy()
+        h.update(b'%d}' % self.nonce)
+        return h.hexdigest()
     
     def mine(self, difficulty: int = 4):
         """
         Mine the block by finding a nonce that gives a hash with
         the required number of leading zeros.
+        
+        Raises:
+            ValueError: If difficulty is not an integer in [0, 64]
+        """
+        _check_difficulty(difficulty)
+        # Only the nonce changes while mining: resume from a copy of the
+        # header state for every attempt
+        self.nonce = _search_nonce(self._header_hasher(), self.nonce, difficulty)
+    
+    def mine_parallel(self, difficulty: int = 4, workers: Optional[int] = None):
+        """
+        Mine the block using several processes.
+        
+        Each worker scans a disjoint stride of the nonce space starting at
+        the current nonce; the first nonce found wins and the remaining
+        workers are stopped. The winner is a valid nonce but not
+        necessarily the smallest one.
+        
+        Args:
+            difficulty: Number of leading zero hex digits required
+            workers: Number of processes (defaults to the CPU count)
+        
+        Raises:
+            ValueError: If difficulty is not an integer in [0, 64]
+            RuntimeError: If a worker fails or exits without a result
+        """
+        _check_difficulty(difficulty)
+        workers = workers or os.cpu_count() or 1
+        # Workers only need the header bytes, not the block itself
+        header = self._serialize_header()
+        found = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_mine_worker,
+                args=(header, self.nonce + i, workers, difficulty, found),
+                daemon=True
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            result = self._wait_for_nonce(found, processes)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+        if isinstance(result, Exception):
+            raise RuntimeError("Mining worker failed") from result
+        self.nonce = result
+    
+    @staticmethod
+    def _wait_for_nonce(found, processes):
+        """
+        Get the first result a mining worker reports.
+        
+        Polls rather than blocking, so a worker killed before it could
+        report anything cannot leave the caller waiting forever.
         """
-        target = '0' * difficulty
         while True:
-            hash = self.compute_hash()
-            if hash.startswith(target):
-                break
-            self.nonce += 1
+            try:
+                return found.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+        # A worker may have reported just before exiting
+        try:
+            return found.get_nowait()
+        except queue.Empty:
+            raise RuntimeError("Mining workers exited without a result")
+    
+    @staticmethod
+    def validate_chain(blocks: List['QuantumResistantBlock']) -> bool:
+        """
+        Check that every block links to the hash of the block before it
+        and sits at the next height.
+        
+        Args:
+            blocks: Blocks in chain order
+        
+        Returns:
+            bool: True if each block's previous_hash and height match its predecessor
+        """
+        # Hash each block once and compare against its successor's link
+        hashes = [block.compute_hash() for block in blocks[:-1]]
+        return all(
+            block.previous_hash == prev_hash and block.height == prev.height + 1
+            for prev_hash, prev, block in zip(hashes, blocks, blocks[1:])
+        )
+
+# Size in bytes of a wallet address
+ADDRESS_SIZE = 20
+# AES-GCM nonce size and how many nonces a wallet draws from the OS at once
+NONCE_SIZE = 12
+NONCE_POOL_COUNT = 341
+# Maximum number of transaction signatures a wallet keeps for re-signing
+SIGNATURE_CACHE_SIZE = 4096
 
 class QuantumResistantWallet:
     """
@@ -146,16 +383,55 @@ class QuantumResistantWallet:
     - Secure messaging between wallets
     """
     
-    def __init__(self):
-        """Initialize wallet with quantum-resistant keys."""
+    def __init__(self, enc_keypair: Optional[Tuple[Dict, Dict]] = None,
+                 sign_keypair: Optional[Tuple[Dict, Dict]] = None):
+        """
+        Initialize wallet with quantum-resistant keys.
+        
+        Args:
+            enc_keypair: Optional pre-generated Kyber (public, private) key pair
+            sign_keypair: Optional pre-generated Dilithium (private, public) key pair
+        """
         # Generate Kyber keys for encryption
-        self.enc_public_key, self.enc_private_key = kyber_keygen()
+        self.enc_public_key, self.enc_private_key = enc_keypair or kyber_keygen()
         
         # Generate Dilithium keys for signing
-        self.sign_private_key, self.sign_public_key = dilithium_keygen()
+        self.sign_private_key, self.sign_public_key = sign_keypair or dilithium_keygen()
+        
+        # Wallet address is a 20-byte BLAKE2b digest of the packed signing public key
+        self.address = hashlib.blake2b(
+            bytes(self.sign_public_key), digest_size=ADDRESS_SIZE).digest()
+        
+        # Pool of random bytes that AES-GCM nonces are drawn from
+        self._nonce_pool = b''
+        self._nonce_offset = 0
+        
+        # Recently produced signatures, keyed by digest of the signed payload
+        self._sig_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+    
+    @classmethod
+    def create_many(cls, count: int) -> List['QuantumResistantWallet']:
+        """
+        Create several wallets, generating all of their keys in one batch.
         
-        # Wallet address is derived from signing public key's key_seed
-        self.address = self.sign_public_key['key_seed'].hex()
+        Args:
+            count: Number of wallets to create
+        
+        Returns:
+            List of new wallets
+        """
+        enc_keypairs = kyber_keygen_batch(count)
+        sign_keypairs = dilithium_keygen_batch(count)
+        return [cls(enc, sig) for enc, sig in zip(enc_keypairs, sign_keypairs)]
+    
+    def _next_nonce(self) -> bytes:
+        """Take a fresh 96-bit AES-GCM nonce from the wallet's random pool."""
+        if self._nonce_offset >= len(self._nonce_pool):
+            self._nonce_pool = os.urandom(NONCE_SIZE * NONCE_POOL_COUNT)
+            self._nonce_offset = 0
+        nonce = self._nonce_pool[self._nonce_offset:self._nonce_offset + NONCE_SIZE]
+        self._nonce_offset += NONCE_SIZE
+        return nonce
     
     def encrypt_message(self, recipient_key: bytes, message: str) -> Dict:
         """
@@ -170,14 +446,12 @@ class QuantumResistantWallet:
         """
         message_bytes = message.encode()
         
-        # Generate a random encryption key and encapsulate it
-        encryption_key = secure_random_bytes(32)
+        # Encapsulate a fresh shared secret for the recipient
         key_ciphertext, shared_secret = encapsulate(recipient_key)
         
         # Use shared secret to encrypt the message
-        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         cipher = AESGCM(shared_secret)
-        nonce = os.urandom(12)
+        nonce = self._next_nonce()
         ciphertext = cipher.encrypt(nonce, message_bytes, None)
         
         return {
@@ -201,7 +475,6 @@ class QuantumResistantWallet:
         shared_secret = decapsulate(encrypted['key'], self.enc_private_key)
         
         # Decrypt the message using the shared secret
-        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         cipher = AESGCM(shared_secret)
         try:
             message_bytes = cipher.decrypt(encrypted['nonce'], encrypted['message'], None)
@@ -222,15 +495,25 @@ class QuantumResistantWallet:
         if transaction.sender != self.address:
             raise ValueError("Cannot sign transaction from different sender")
         
-        transaction.signature = sign(
-            self.sign_private_key,
-            transaction.serialize()
-        )
+        # Signing the same payload again (e.g. on a retry) reuses the
+        # earlier signature, which is equally valid
+        payload = transaction.serialize()
+        cache_key = hashlib.blake2b(payload, digest_size=16).digest()
+        signature = self._sig_cache.get(cache_key)
+        if signature is None:
+            signature = sign(self.sign_private_key, memoryview(payload))
+            self._sig_cache[cache_key] = signature
+            if len(self._sig_cache) > SIGNATURE_CACHE_SIZE:
+                self._sig_cache.popitem(last=False)
+        else:
+            self._sig_cache.move_to_end(cache_key)
+        
+        transaction.signature = signature
         # Store the public key for verification
         transaction.sender_public_key = self.sign_public_key
         return transaction
     
-    def create_transaction(self, recipient: str, amount: float) -> QuantumResistantTransaction:
+    def create_transaction(self, recipient: bytes, amount: float) -> QuantumResistantTransaction:
         """
         Create and sign a new transaction.
         
@@ -244,8 +527,7 @@ class QuantumResistantWallet:
         transaction = QuantumResistantTransaction(
             sender=self.address,
             recipient=recipient,
-            amount=amount,
-            timestamp=datetime.utcnow().isoformat()
+            amount=amount
         )
         return self.sign_transaction(transaction)
     
@@ -269,11 +551,10 @@ def main():
     
     # Create wallets
     print("\n1. Creating wallets for Alice and Bob...")
-    alice = QuantumResistantWallet()
-    bob = QuantumResistantWallet()
+    alice, bob = QuantumResistantWallet.create_many(2)
     print("   ✓ Wallets created successfully")
-    print(f"   Alice's address: {alice.address[:16]}...")
-    print(f"   Bob's address: {bob.address[:16]}...")
+    print(f"   Alice's address: {alice.address.hex()[:16]}...")
+    print(f"   Bob's address: {bob.address.hex()[:16]}...")
     
     # Create transaction
     print("\n2. Creating a transaction from Alice to Bob...")
@@ -293,7 +574,8 @@ def main():
     print("\n4. Creating and mining a block...")
     block = QuantumResistantBlock(
         transactions=[transaction],
-        previous_hash="0" * 64
+        previous_hash="0" * 64,
+        height=0
     )
     block.mine(difficulty=4)
     print("   ✓ Block mined successfully")
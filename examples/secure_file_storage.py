@@ -25,43 +25,309 @@ The example implements a simple secure file storage system where:
 - All cryptographic operations are quantum-resistant
 """
 
+import io
 import os
-import json
+import secrets
+import bisect
 import hashlib
-import base64
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+import hmac
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from pathlib import Path
 
+from cryptography.exceptions import InvalidSignature, InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.poly1305 import Poly1305
 from src.kyber import generate_keys as kyber_keygen, encapsulate, decapsulate
-from src.dilithium import generate_keys as dilithium_keygen, sign, verify
-from src.utils import secure_random_bytes
+from src.dilithium import generate_keys as dilithium_keygen, sign, verify, batch_verify
+from src.utils import DATACLASS_SLOTS
 
-@dataclass
+# Files are encrypted and decrypted in chunks of this many bytes
+CHUNK_SIZE = 1 << 20
+# AEAD nonce and authentication tag sizes (shared by both algorithms)
+NONCE_SIZE = 12
+TAG_SIZE = 16
+# Algorithm byte leading every encrypted file
+AEAD_AES_GCM = 1
+AEAD_CHACHA20_POLY1305 = 2
+# Version byte leading the canonical (signed) metadata encoding
+METADATA_SCHEMA_VERSION = 2
+# Sizes of the Kyber ciphertext parts (c, nonce) and of the shared secret
+KYBER_C_SIZE = 32
+KYBER_NONCE_SIZE = 32
+SHARED_SECRET_SIZE = 32
+# Length of the packed Kyber ciphertext (c || nonce)
+KYBER_CT_SIZE = KYBER_C_SIZE + KYBER_NONCE_SIZE
+# AES-256 file encryption key size
+FILE_KEY_SIZE = 32
+# Key records are packed ciphertext || shared secret || encryption key
+KEY_RECORD_SIZE = KYBER_CT_SIZE + SHARED_SECRET_SIZE + FILE_KEY_SIZE
+# Maximum number of verified metadata records remembered per storage
+VERIFY_CACHE_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def _aes_accelerated() -> bool:
+    """
+    Check whether the CPU has hardware AES and carry-less multiply.
+    
+    Looks for the aes/pclmulqdq (x86) or aes/pmull (ARMv8) flags in
+    /proc/cpuinfo. Where that file is unavailable, hardware AES is
+    assumed, as it is on practically every non-Linux desktop platform.
+    """
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpuinfo = f.read()
+    except OSError:
+        return True
+    
+    flags = set()
+    for line in cpuinfo.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip() in ('flags', 'Features'):
+            flags.update(value.split())
+    return 'aes' in flags and bool(flags & {'pclmulqdq', 'pmull'})
+
+@lru_cache(maxsize=None)
+def _default_aead() -> int:
+    """
+    Pick the file encryption algorithm for this machine.
+    
+    AES-GCM is used where the CPU accelerates it; elsewhere
+    ChaCha20-Poly1305 is faster than software AES. The fallback is
+    logged as a warning the first time it is taken.
+    """
+    if _aes_accelerated():
+        return AEAD_AES_GCM
+    logger.warning("No hardware AES support detected, encrypting files "
+                   "with ChaCha20-Poly1305")
+    return AEAD_CHACHA20_POLY1305
+
+class _ChaCha20Poly1305Stream:
+    """
+    Streaming ChaCha20-Poly1305 (RFC 8439) without associated data.
+    
+    Offers the update_into/finalize interface of a cryptography cipher
+    context so it can be driven by _stream_cipher; the output matches the
+    one-shot ChaCha20Poly1305 AEAD.
+    """
+    
+    def __init__(self, key: bytes, nonce: bytes, encrypt: bool,
+                 tag: Optional[bytes] = None):
+        # Block 0 of the keystream keys Poly1305, the data starts at block 1
+        mac_key = Cipher(algorithms.ChaCha20(key, bytes(4) + nonce), None).encryptor()
+        self._mac = Poly1305(mac_key.update(bytes(32)))
+        cipher = Cipher(algorithms.ChaCha20(key, struct.pack('<I', 1) + nonce), None)
+        self._context = cipher.encryptor() if encrypt else cipher.decryptor()
+        self._encrypt = encrypt
+        self._expected_tag = tag
+        self._length = 0
+        self.tag: Optional[bytes] = None
+    
+    def update_into(self, data, buf) -> int:
+        # The MAC always covers the ciphertext side
+        if not self._encrypt:
+            self._mac.update(data)
+        written = self._context.update_into(data, buf)
+        if self._encrypt:
+            self._mac.update(memoryview(buf)[:written])
+        self._length += written
+        return written
+    
+    def finalize(self) -> bytes:
+        """
+        Finish the stream, computing the tag or checking the expected one.
+        
+        Raises:
+            InvalidTag: If decrypting and the tag does not match
+        """
+        self._context.finalize()
+        self._mac.update(bytes(-self._length % 16))
+        self._mac.update(struct.pack('<QQ', 0, self._length))
+        if self._encrypt:
+            self.tag = self._mac.finalize()
+        else:
+            try:
+                self._mac.verify(self._expected_tag)
+            except InvalidSignature:
+                raise InvalidTag()
+        return b''
+
+def _pack_ct(ciphertext: Dict) -> bytes:
+    """Flatten a Kyber ciphertext into c || nonce."""
+    return ciphertext['c'] + ciphertext['nonce']
+
+def _unpack_ct(data: bytes) -> Dict:
+    """Split a packed Kyber ciphertext back into its c and nonce parts."""
+    return {'c': data[:-KYBER_NONCE_SIZE], 'nonce': data[-KYBER_NONCE_SIZE:]}
+
+def _read_bytes(path: str) -> bytes:
+    """Read a whole file given as a plain string path."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """Write a whole file given as a plain string path."""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def _stream_cipher(context, source: BinaryIO, target: BinaryIO,
+                   length: Optional[int] = None) -> int:
+    """
+    Pass up to length bytes of source through a cipher context into target.
+    
+    Input and output go through two buffers allocated once per call, so
+    no per-chunk bytes objects are created.
+    
+    Returns:
+        Number of bytes processed
+    """
+    in_view = memoryview(bytearray(CHUNK_SIZE))
+    # update_into needs room for one block beyond the input
+    out_buffer = bytearray(CHUNK_SIZE + 15)
+    out_view = memoryview(out_buffer)
+    processed = 0
+    while length is None or processed < length:
+        wanted = CHUNK_SIZE if length is None else min(CHUNK_SIZE, length - processed)
+        count = source.readinto(in_view[:wanted])
+        if not count:
+            break
+        written = context.update_into(in_view[:count], out_buffer)
+        target.write(out_view[:written])
+        processed += count
+    return processed
+
+def _format_timestamp(ns: int) -> str:
+    """Format a nanosecond UTC timestamp as an ISO 8601 string."""
+    seconds, ns = divmod(ns, 10**9)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(
+        microsecond=ns // 1000).isoformat()
+
+def _lp(value: str) -> bytes:
+    """Encode a string as UTF-8 prefixed with its 32-bit length."""
+    encoded = value.encode()
+    return struct.pack('<I', len(encoded)) + encoded
+
+@dataclass(**DATACLASS_SLOTS)
 class FileMetadata:
     """Represents metadata for a stored file."""
     file_id: str
     owner_id: str
     filename: str
     size_bytes: int
-    created_at: str
+    created_at: int  # nanoseconds since the epoch
     encryption_key_id: str
     shared_with: List[str]
     signature: Optional[bytes] = None
+    _serialized: Optional[Tuple[List[str], bytes]] = field(
+        default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name, value):
+        # Drop the cached canonical form whenever a signed field changes
+        if name not in ('signature', '_serialized'):
+            object.__setattr__(self, '_serialized', None)
+        object.__setattr__(self, name, value)
+    
+    def __post_init__(self):
+        # shared_with is kept sorted so serialize() can use it as is
+        self.shared_with.sort()
     
     def serialize(self) -> bytes:
         """Serialize metadata for signing/verification."""
-        data = {
-            'file_id': self.file_id,
-            'owner_id': self.owner_id,
-            'filename': self.filename,
-            'size_bytes': self.size_bytes,
-            'created_at': self.created_at,
-            'encryption_key_id': self.encryption_key_id,
-            'shared_with': sorted(self.shared_with)
-        }
-        return json.dumps(data, sort_keys=True).encode()
+        # shared_with is mutated in place, so the cached form remembers
+        # the list it was built from
+        cached = self._serialized
+        if cached is None or cached[0] != self.shared_with:
+            # Fixed field order, strings length-prefixed, so the encoding
+            # is unambiguous without any JSON canonicalization
+            shared_with = self.shared_with
+            serialized = b''.join([
+                struct.pack('<B', METADATA_SCHEMA_VERSION),
+                _lp(self.file_id),
+                _lp(self.owner_id),
+                _lp(self.filename),
+                struct.pack('<Q', self.size_bytes),
+                struct.pack('<Q', self.created_at),
+                _lp(self.encryption_key_id),
+                struct.pack('<I', len(shared_with)),
+                *map(_lp, shared_with)
+            ])
+            cached = (list(self.shared_with), serialized)
+            self._serialized = cached
+        return cached[1]
+    
+    @classmethod
+    def deserialize(cls, data: bytes, signature: Optional[bytes] = None) -> 'FileMetadata':
+        """
+        Rebuild metadata from the encoding produced by serialize().
+        
+        Args:
+            data: Canonical metadata bytes
+            signature: Signature over data, if any
+        
+        Returns:
+            FileMetadata with data already cached as its serialized form
+        
+        Raises:
+            ValueError: If data is not a valid encoding
+        """
+        offset = 0
+        
+        def read(fmt):
+            nonlocal offset
+            value, = struct.unpack_from(fmt, data, offset)
+            offset += struct.calcsize(fmt)
+            return value
+        
+        def read_str():
+            nonlocal offset
+            length = read('<I')
+            end = offset + length
+            if end > len(data):
+                raise ValueError("Invalid metadata")
+            value = data[offset:end].decode()
+            offset = end
+            return value
+        
+        try:
+            if read('<B') != METADATA_SCHEMA_VERSION:
+                raise ValueError("Unsupported metadata version")
+            file_id = read_str()
+            owner_id = read_str()
+            filename = read_str()
+            size_bytes = read('<Q')
+            created_at = read('<Q')
+            encryption_key_id = read_str()
+            shared_with = [read_str() for _ in range(read('<I'))]
+        except (struct.error, UnicodeDecodeError):
+            raise ValueError("Invalid metadata")
+        if offset != len(data):
+            raise ValueError("Invalid metadata")
+        # serialize() writes shared_with sorted and without duplicates
+        if any(a >= b for a, b in zip(shared_with, shared_with[1:])):
+            raise ValueError("Invalid metadata")
+        
+        metadata = cls(
+            file_id=file_id,
+            owner_id=owner_id,
+            filename=filename,
+            size_bytes=size_bytes,
+            created_at=created_at,
+            encryption_key_id=encryption_key_id,
+            shared_with=shared_with,
+            signature=signature
+        )
+        metadata._serialized = (list(shared_with), bytes(data))
+        return metadata
 
 class SecureFileStorage:
     """
@@ -98,8 +364,21 @@ class SecureFileStorage:
         for directory in [self.files_dir, self.metadata_dir, self.keys_dir]:
             directory.mkdir(exist_ok=True)
         
+        # String prefixes for the per-file hot paths, so they skip building
+        # Path objects on every access
+        self._files_prefix = str(self.files_dir) + os.sep
+        self._metadata_prefix = str(self.metadata_dir) + os.sep
+        self._keys_prefix = str(self.keys_dir) + os.sep
+        
+        # AEAD used for new files (AES-GCM or ChaCha20-Poly1305)
+        self._aead = _default_aead()
+        
         # Store user data
         self.users: Dict[str, Dict] = {}
+        
+        # Digest of the metadata and signature bytes last verified per file
+        self._verified: "OrderedDict[str, bytes]" = OrderedDict()
+        self._verified_lock = threading.Lock()
     
     def create_user(self, user_id: str) -> Dict:
         """
@@ -168,13 +447,11 @@ class SecureFileStorage:
         if not filepath.exists():
             raise ValueError(f"File not found: {filepath}")
         
-        # Generate file ID and read file
-        file_id = secure_random_bytes(16).hex()
-        file_data = filepath.read_bytes()
-        
-        # Generate unique encryption key
-        key_id = secure_random_bytes(16).hex()
-        encryption_key = secure_random_bytes(32)
+        # Generate file ID and unique encryption key from a single draw
+        random_bytes = secrets.token_bytes(64)
+        file_id = random_bytes[:16].hex()
+        key_id = random_bytes[16:32].hex()
+        encryption_key = random_bytes[32:]
         
         # Encrypt file data
         ciphertext, shared_secret = encapsulate(
@@ -182,16 +459,17 @@ class SecureFileStorage:
             encryption_key
         )
         
-        # Encrypt file with encryption key
-        encrypted_data = self._encrypt_file_data(file_data, encryption_key)
+        # Encrypt file with encryption key, streaming it chunk by chunk
+        with filepath.open('rb') as source, open(self._files_prefix + file_id, 'wb') as target:
+            size_bytes = self._encrypt_file_data(source, target, encryption_key)
         
         # Create metadata
         metadata = FileMetadata(
             file_id=file_id,
             owner_id=user_id,
             filename=filepath.name,
-            size_bytes=len(file_data),
-            created_at=datetime.utcnow().isoformat(),
+            size_bytes=size_bytes,
+            created_at=time.time_ns(),
             encryption_key_id=key_id,
             shared_with=[]
         )
@@ -202,20 +480,11 @@ class SecureFileStorage:
             metadata.serialize()
         )
         
-        # Store encrypted file and metadata
-        (self.files_dir / file_id).write_bytes(encrypted_data)
-        (self.metadata_dir / file_id).write_text(
-            json.dumps(self._metadata_to_dict(metadata))
-        )
+        # Store metadata
+        self._store_metadata(metadata)
         
-        # Store key data in base64 format
-        key_data = {
-            'c': base64.b64encode(ciphertext['c']).decode(),
-            'nonce': base64.b64encode(ciphertext['nonce']).decode(),
-            'shared_secret': base64.b64encode(shared_secret).decode(),
-            'encryption_key': base64.b64encode(encryption_key).decode()
-        }
-        (self.keys_dir / key_id).write_text(json.dumps(key_data))
+        # Store key data
+        self._store_key(key_id, ciphertext, shared_secret, encryption_key)
         
         return metadata
     
@@ -234,11 +503,30 @@ class SecureFileStorage:
             owner_id: ID of the file owner
             recipient_id: ID of the user to share with
         
+        Raises:
+            ValueError: If file/users not found or unauthorized
+        """
+        self.share_file_many(file_id, owner_id, [recipient_id])
+    
+    def share_file_many(self, file_id: str, owner_id: str,
+                        recipient_ids: List[str]) -> None:
+        """
+        Share a file with several users at once.
+        
+        The owner's key is recovered once, the per-recipient keys are
+        encapsulated and written on a thread pool, and the metadata is
+        signed and stored once for the whole batch.
+        
+        Args:
+            file_id: ID of the file to share
+            owner_id: ID of the file owner
+            recipient_ids: IDs of the users to share with
+        
         Raises:
             ValueError: If file/users not found or unauthorized
         """
         # Verify users exist
-        if owner_id not in self.users or recipient_id not in self.users:
+        if owner_id not in self.users or any(r not in self.users for r in recipient_ids):
             raise ValueError("User not found")
         
         # Load and verify metadata
@@ -246,52 +534,53 @@ class SecureFileStorage:
         if metadata.owner_id != owner_id:
             raise ValueError("Not authorized to share this file")
         
-        if recipient_id in metadata.shared_with:
+        # Skip users the file is already shared with
+        new_recipients = [r for r in dict.fromkeys(recipient_ids)
+                          if r not in metadata.shared_with]
+        if not new_recipients:
             return  # Already shared
         
         # Load encryption key
-        key_data = json.loads((self.keys_dir / metadata.encryption_key_id).read_text())
-        key_ciphertext = {
-            'c': base64.b64decode(key_data['c']),
-            'nonce': base64.b64decode(key_data['nonce'])
-        }
-        shared_secret = base64.b64decode(key_data['shared_secret'])
-        encryption_key = base64.b64decode(key_data['encryption_key'])
+        key_ciphertext, shared_secret, encryption_key = self._load_key(
+            metadata.encryption_key_id
+        )
         
-        # Re-encrypt key for recipient
+        # Re-encrypt key for recipients
         decrypted_key = decapsulate(
             key_ciphertext,
             self.users[owner_id]['enc_private_key']
         )
-        if decrypted_key != shared_secret:
+        # Constant-time comparison, so the check leaks no timing information
+        if not hmac.compare_digest(decrypted_key, shared_secret):
             raise ValueError("Decryption failed: shared secret mismatch")
         
-        # Generate new shared secret for recipient
-        recipient_ciphertext, recipient_shared_secret = encapsulate(
-            self.users[recipient_id]['enc_public_key'],
-            encryption_key
-        )
+        def share_key(recipient_id):
+            # Generate new shared secret for recipient and store their key
+            recipient_ciphertext, recipient_shared_secret = encapsulate(
+                self.users[recipient_id]['enc_public_key'],
+                encryption_key
+            )
+            self._store_key(
+                f"{metadata.encryption_key_id}_{recipient_id}",
+                recipient_ciphertext,
+                recipient_shared_secret,
+                encryption_key
+            )
+        
+        if len(new_recipients) == 1:
+            share_key(new_recipients[0])
+        else:
+            with ThreadPoolExecutor() as pool:
+                list(pool.map(share_key, new_recipients))
         
-        # Update metadata
-        metadata.shared_with.append(recipient_id)
+        # Update metadata once the recipients' keys are in place
+        for recipient_id in new_recipients:
+            bisect.insort(metadata.shared_with, recipient_id)
         metadata.signature = sign(
             self.users[owner_id]['sign_private_key'],
             metadata.serialize()
         )
-        
-        # Store updated metadata and recipient's key
-        recipient_key_data = {
-            'c': base64.b64encode(recipient_ciphertext['c']).decode(),
-            'nonce': base64.b64encode(recipient_ciphertext['nonce']).decode(),
-            'shared_secret': base64.b64encode(recipient_shared_secret).decode(),
-            'encryption_key': base64.b64encode(encryption_key).decode()
-        }
-        (self.metadata_dir / file_id).write_text(
-            json.dumps(self._metadata_to_dict(metadata))
-        )
-        (self.keys_dir / f"{metadata.encryption_key_id}_{recipient_id}").write_text(
-            json.dumps(recipient_key_data)
-        )
+        self._store_metadata(metadata)
     
     def read_file(self, file_id: str, user_id: str) -> bytes:
         """
@@ -312,6 +601,48 @@ class SecureFileStorage:
         Raises:
             ValueError: If unauthorized or file integrity check fails
         """
+        encryption_key = self._load_file_key(file_id, user_id)
+        plaintext = io.BytesIO()
+        with open(self._files_prefix + file_id, 'rb') as source:
+            # The buffer is dropped if the tag check fails, so
+            # unauthenticated plaintext is never handed back
+            self._decrypt_file_data(source, plaintext, encryption_key)
+        return plaintext.getvalue()
+    
+    def read_file_to(self, file_id: str, user_id: str, output_path: str) -> None:
+        """
+        Decrypt a file straight to disk without holding it in memory.
+        
+        Plaintext is streamed to a temporary file next to output_path,
+        which is moved into place only once the authentication tag has
+        been verified.
+        
+        Args:
+            file_id: ID of the file to read
+            user_id: ID of the user reading the file
+            output_path: Where to write the decrypted contents
+        
+        Raises:
+            ValueError: If unauthorized or file integrity check fails
+        """
+        encryption_key = self._load_file_key(file_id, user_id)
+        output_path = Path(output_path)
+        partial_path = output_path.with_name(output_path.name + '.part')
+        try:
+            with open(self._files_prefix + file_id, 'rb') as source, partial_path.open('wb') as target:
+                self._decrypt_file_data(source, target, encryption_key)
+            os.replace(partial_path, output_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+    
+    def _load_file_key(self, file_id: str, user_id: str) -> bytes:
+        """
+        Check a user's access to a file and recover its encryption key.
+        
+        Raises:
+            ValueError: If unauthorized or the key cannot be recovered
+        """
         if user_id not in self.users:
             raise ValueError("User not found")
         
@@ -320,91 +651,258 @@ class SecureFileStorage:
         if user_id != metadata.owner_id and user_id not in metadata.shared_with:
             raise ValueError("Not authorized to read this file")
         
-        # Load encrypted file
-        encrypted_data = (self.files_dir / file_id).read_bytes()
-        
         # Load encryption key
         key_id = metadata.encryption_key_id
         if user_id != metadata.owner_id:
             key_id = f"{key_id}_{user_id}"
-        key_data = json.loads((self.keys_dir / key_id).read_text())
-        key_ciphertext = {
-            'c': base64.b64decode(key_data['c']),
-            'nonce': base64.b64decode(key_data['nonce'])
-        }
-        shared_secret = base64.b64decode(key_data['shared_secret'])
-        encryption_key = base64.b64decode(key_data['encryption_key'])
+        key_ciphertext, shared_secret, encryption_key = self._load_key(key_id)
         
         # Decrypt key and verify shared secret
         decrypted_key = decapsulate(
             key_ciphertext,
             self.users[user_id]['enc_private_key']
         )
-        if decrypted_key != shared_secret:
+        # Constant-time comparison, so the check leaks no timing information
+        if not hmac.compare_digest(decrypted_key, shared_secret):
             raise ValueError("Decryption failed: shared secret mismatch")
-        return self._decrypt_file_data(encrypted_data, encryption_key)
+        return encryption_key
+    
+    def _store_key(self, key_id: str, ciphertext: Dict, shared_secret: bytes,
+                   encryption_key: bytes) -> None:
+        """Write a key record as fixed-size raw bytes."""
+        _write_bytes(
+            self._keys_prefix + key_id,
+            _pack_ct(ciphertext) + shared_secret + encryption_key
+        )
     
-    def _encrypt_file_data(self, data: bytes, key: bytes) -> bytes:
-        """Encrypt file data with the given key using AES-GCM."""
-        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    def _load_key(self, key_id: str) -> Tuple[Dict, bytes, bytes]:
+        """
+        Read a key record written by _store_key.
         
-        # Use encryption key directly with AES-GCM
-        cipher = AESGCM(key)
-        nonce = os.urandom(12)  # 96-bit nonce for GCM
-        ciphertext = cipher.encrypt(nonce, data, None)
-        return nonce + ciphertext
+        Returns:
+            Tuple of (Kyber ciphertext, shared secret, encryption key)
+        
+        Raises:
+            ValueError: If the record is malformed
+        """
+        record = _read_bytes(self._keys_prefix + key_id)
+        if len(record) != KEY_RECORD_SIZE:
+            raise ValueError("Invalid key record")
+        
+        # Fields sit at fixed offsets, so no header needs parsing
+        secret_end = KYBER_CT_SIZE + SHARED_SECRET_SIZE
+        return (
+            _unpack_ct(record[:KYBER_CT_SIZE]),
+            record[KYBER_CT_SIZE:secret_end],
+            record[secret_end:]
+        )
+    
+    def _encrypt_file_data(self, source: BinaryIO, target: BinaryIO, key: bytes) -> int:
+        """
+        Encrypt a file stream with the given key.
+        
+        Uses the storage's AEAD (AES-GCM or ChaCha20-Poly1305) and writes
+        the algorithm byte, the 12-byte nonce, the ciphertext and the
+        16-byte authentication tag to target.
+        
+        Returns:
+            Number of plaintext bytes encrypted
+        """
+        nonce = os.urandom(NONCE_SIZE)  # 96-bit nonce for either AEAD
+        if self._aead == AEAD_AES_GCM:
+            encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+        else:
+            encryptor = _ChaCha20Poly1305Stream(key, nonce, encrypt=True)
+        target.write(bytes((self._aead,)))
+        target.write(nonce)
+        size = _stream_cipher(encryptor, source, target)
+        target.write(encryptor.finalize())
+        target.write(encryptor.tag)
+        return size
     
-    def _decrypt_file_data(self, encrypted_data: bytes, key: bytes) -> bytes:
-        """Decrypt file data with the given key using AES-GCM."""
-        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    def _decrypt_file_data(self, source: BinaryIO, target: BinaryIO, key: bytes) -> None:
+        """
+        Decrypt a file stream with the given key.
+        
+        The algorithm is taken from the file itself, so files written with
+        either AEAD can be read on any machine. Plaintext is written to
+        target as it is decrypted, but the authentication tag is only
+        checked at the end, so callers must discard target if this raises.
         
-        if len(encrypted_data) < 12:
+        Raises:
+            ValueError: If the data is malformed or fails authentication
+        """
+        total = source.seek(0, os.SEEK_END)
+        if total < 1 + NONCE_SIZE + TAG_SIZE:
             raise ValueError("Invalid encrypted data")
-            
-        # Use encryption key directly with AES-GCM
-        cipher = AESGCM(key)
-        nonce = encrypted_data[:12]
-        ciphertext = encrypted_data[12:]
+        
+        # Layout: algorithm || nonce || ciphertext || tag
+        source.seek(total - TAG_SIZE)
+        tag = source.read(TAG_SIZE)
+        source.seek(0)
+        algorithm = source.read(1)[0]
+        nonce = source.read(NONCE_SIZE)
+        
+        if algorithm == AEAD_AES_GCM:
+            decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+        elif algorithm == AEAD_CHACHA20_POLY1305:
+            decryptor = _ChaCha20Poly1305Stream(key, nonce, encrypt=False, tag=tag)
+        else:
+            raise ValueError("Unsupported encryption algorithm")
+        _stream_cipher(decryptor, source, target, total - 1 - NONCE_SIZE - TAG_SIZE)
         try:
-            return cipher.decrypt(nonce, ciphertext, None)
-        except Exception:
+            decryptor.finalize()
+        except InvalidTag:
             raise ValueError("Decryption failed")
     
-    def _load_metadata(self, file_id: str) -> FileMetadata:
-        """Load and verify file metadata."""
-        try:
-            data = json.loads(
-                (self.metadata_dir / file_id).read_text()
+    def list_files(self, user_id: str) -> List[FileMetadata]:
+        """
+        List the files a user owns or has been given access to.
+        
+        Records that fail verification are left out.
+        
+        Args:
+            user_id: ID of the user listing files
+        
+        Returns:
+            Verified metadata for every file the user can read
+        
+        Raises:
+            ValueError: If user not found
+        """
+        if user_id not in self.users:
+            raise ValueError("User not found")
+        
+        return [
+            metadata for metadata in self._load_all_metadata().values()
+            if user_id == metadata.owner_id or user_id in metadata.shared_with
+        ]
+    
+    def _load_all_metadata(self) -> Dict[str, FileMetadata]:
+        """
+        Load and verify every stored metadata record.
+        
+        Records are read on a thread pool (file reads release the GIL)
+        and the signatures are checked in one batch per owner. Verified
+        records are added to the verification cache, so later single-file
+        loads skip verification. Records that are malformed, belong to an
+        unknown owner or fail verification are left out.
+        
+        Returns:
+            Verified metadata keyed by file ID
+        """
+        with os.scandir(self.metadata_dir) as entries:
+            file_ids = [entry.name for entry in entries
+                        if not entry.name.endswith('.sig')]
+        
+        def read(file_id):
+            try:
+                return self._read_metadata(file_id)
+            except ValueError:
+                return None
+        
+        with ThreadPoolExecutor() as pool:
+            records = [record for record in pool.map(read, file_ids) if record]
+        
+        # Group the records not verified yet by owner
+        loaded = {}
+        pending: Dict[str, List[Tuple[FileMetadata, bytes]]] = {}
+        for metadata, digest in records:
+            if self._is_verified(metadata.file_id, digest):
+                loaded[metadata.file_id] = metadata
+            elif metadata.owner_id in self.users:
+                pending.setdefault(metadata.owner_id, []).append((metadata, digest))
+        
+        # Verify each owner's signatures together
+        for owner_id, owner_records in pending.items():
+            results = batch_verify(
+                self.users[owner_id]['sign_public_key'],
+                [(metadata.serialize(), metadata.signature) for metadata, _ in owner_records]
             )
-            # Convert base64 signature back to bytes
-            if data.get('signature'):
-                data['signature'] = base64.b64decode(data['signature'])
-            metadata = FileMetadata(**data)
-            
-            # Verify signature
+            for (metadata, digest), valid in zip(owner_records, results):
+                if valid:
+                    self._mark_verified(metadata.file_id, digest)
+                    loaded[metadata.file_id] = metadata
+        return loaded
+    
+    def _store_metadata(self, metadata: FileMetadata) -> None:
+        """
+        Write metadata and its raw signature sidecar.
+        
+        The metadata file holds exactly the bytes that were signed, so
+        nothing is serialized a second time for storage.
+        """
+        with self._verified_lock:
+            self._verified.pop(metadata.file_id, None)
+        path = self._metadata_prefix + metadata.file_id
+        _write_bytes(path, metadata.serialize())
+        _write_bytes(path + '.sig', metadata.signature)
+    
+    def _read_metadata(self, file_id: str) -> Tuple[FileMetadata, bytes]:
+        """
+        Read stored metadata without verifying it.
+        
+        Returns:
+            The metadata and a digest of its stored bytes and signature
+        
+        Raises:
+            ValueError: If the metadata is missing or malformed
+        """
+        try:
+            path = self._metadata_prefix + file_id
+            raw = _read_bytes(path)
+            # The signature is kept as raw bytes next to the metadata
+            signature = _read_bytes(path + '.sig')
+        except FileNotFoundError:
+            raise ValueError("File not found")
+        metadata = FileMetadata.deserialize(raw, signature)
+        
+        digest = hashlib.blake2b(raw, digest_size=16)
+        digest.update(signature)
+        return metadata, digest.digest()
+    
+    def _is_verified(self, file_id: str, digest: bytes) -> bool:
+        """Check whether exactly these stored bytes were already verified."""
+        with self._verified_lock:
+            verified = self._verified.get(file_id) == digest
+            if verified:
+                self._verified.move_to_end(file_id)
+            return verified
+    
+    def _mark_verified(self, file_id: str, digest: bytes) -> None:
+        """Remember that the stored bytes with this digest verified."""
+        with self._verified_lock:
+            self._verified[file_id] = digest
+            if len(self._verified) > VERIFY_CACHE_SIZE:
+                self._verified.popitem(last=False)
+    
+    def _load_metadata(self, file_id: str) -> FileMetadata:
+        """
+        Load and verify file metadata.
+        
+        Verification is skipped when exactly the same metadata and
+        signature bytes were already verified for this file.
+        """
+        metadata, digest = self._read_metadata(file_id)
+        
+        # Verify signature
+        if not self._is_verified(file_id, digest):
             if not verify(
                 self.users[metadata.owner_id]['sign_public_key'],
                 metadata.serialize(),
                 metadata.signature
             ):
                 raise ValueError("Invalid metadata signature")
-            
-            return metadata
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise ValueError("File not found")
+            self._mark_verified(file_id, digest)
+        
+        return metadata
     
     def _metadata_to_dict(self, metadata: FileMetadata) -> Dict:
-        """Convert metadata to dictionary for storage."""
-        return {
-            'file_id': metadata.file_id,
-            'owner_id': metadata.owner_id,
-            'filename': metadata.filename,
-            'size_bytes': metadata.size_bytes,
-            'created_at': metadata.created_at,
-            'encryption_key_id': metadata.encryption_key_id,
-            'shared_with': metadata.shared_with,
-            'signature': base64.b64encode(metadata.signature).decode() if metadata.signature else None
-        }
+        """Convert metadata to a dictionary for display or export (without the signature)."""
+        data = asdict(metadata)
+        del data['signature'], data['_serialized']
+        data['created_at'] = _format_timestamp(metadata.created_at)
+        return data
 
 def main():
     """
@@ -439,7 +937,7 @@ def main():
     print("   ✓ File stored securely")
     print(f"   File ID: {metadata.file_id}")
     print(f"   Size: {metadata.size_bytes} bytes")
-    print(f"   Created: {metadata.created_at}")
+    print(f"   Created: {_format_timestamp(metadata.created_at)}")
     
     # Share file with Bob
     print("\n3. Alice shares the file with Bob...")
@@ -18,17 +18,22 @@ The example shows how to:
 
 import json
 import hashlib
+import secrets
+import time
 from dataclasses import dataclass
-from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import base64
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from src.kyber import generate_keys as kyber_keygen, encapsulate, decapsulate
 from src.dilithium import generate_keys as dilithium_keygen, sign, verify
-from src.utils import secure_random_bytes
+from src.utils import DATACLASS_SLOTS
 
-@dataclass
+def _ratchet(key: bytes) -> bytes:
+    """Derive the next session key from the current one."""
+    return hashlib.blake2b(key, digest_size=32).digest()
+
+@dataclass(**DATACLASS_SLOTS)
 class SecureMessage:
     """
     Represents an encrypted message with metadata.
@@ -37,16 +42,16 @@ class SecureMessage:
     - Message encryption using session key
     - Dilithium signature for authenticity
     - Message chaining for forward secrecy
-    - Timestamp for ordering
+    - Timestamp (nanoseconds since the epoch) for ordering
     """
     sender_id: str
     recipient_id: str
     ciphertext: bytes
     signature: bytes
-    timestamp: str
+    timestamp: int
     message_id: str
     previous_message_id: Optional[str] = None
-    nonce: bytes = None
+    nonce: bytes = b''
 
 class SecureMessagingSession:
     """
@@ -75,6 +80,7 @@ class SecureMessagingSession:
         # Session state
         self.sessions: Dict[str, Dict] = {}
         self.message_chain: Dict[str, str] = {}
+        self._latest_session_id: Optional[str] = None
     
     def get_public_keys(self) -> Dict[str, bytes]:
         """Get the user's public keys."""
@@ -93,16 +99,19 @@ class SecureMessagingSession:
         Returns:
             Session initialization data
         """
+        # Draw the session key and session ID together
+        random_bytes = secrets.token_bytes(48)
+        
         # Generate session key and encapsulate it
-        session_key = secure_random_bytes(32)
+        session_key = random_bytes[:32]
         ciphertext, shared_secret = encapsulate(
             recipient_keys['enc_public_key'],
             session_key
         )
         
         # Create session data
-        session_id = secure_random_bytes(16).hex()
-        timestamp = datetime.utcnow().isoformat()
+        session_id = random_bytes[32:].hex()
+        timestamp = time.time_ns()
         
         # Sign session data
         signature = sign(
@@ -116,6 +125,7 @@ class SecureMessagingSession:
             'recipient_keys': recipient_keys,
             'established': True
         }
+        self._latest_session_id = session_id
         
         return {
             'session_id': session_id,
@@ -156,16 +166,7 @@ class SecureMessagingSession:
             'sender_keys': sender_keys,
             'established': True
         }
-        
-        # Mark session as established for both parties
-        if session_data['session_id'] not in self.sessions:
-            self.sessions[session_data['session_id']] = {
-                'key': shared_secret,
-                'sender_keys': sender_keys,
-                'established': True
-            }
-        else:
-            self.sessions[session_data['session_id']]['established'] = True
+        self._latest_session_id = session_data['session_id']
     
     def encrypt_message(self, message: str, session_id: Optional[str] = None) -> SecureMessage:
         """
@@ -184,19 +185,22 @@ class SecureMessagingSession:
         if not session_id:
             if not self.sessions:
                 raise ValueError("No active session")
-            session_id = list(self.sessions.keys())[-1]
+            session_id = self._latest_session_id
         
         session = self.sessions[session_id]
         if not session['established']:
             raise ValueError("Session not established")
         
+        # Draw the message ID and AES-GCM nonce together
+        random_bytes = secrets.token_bytes(28)
+        
         # Generate message ID and get previous
-        message_id = secure_random_bytes(16).hex()
+        message_id = random_bytes[:16].hex()
         previous_id = self.message_chain.get(session_id)
         
         # Encrypt message
         message_bytes = message.encode()
-        nonce = secure_random_bytes(12)
+        nonce = random_bytes[16:]
         
         # Use AESGCM for encryption
         cipher = AESGCM(session['key'])
@@ -211,7 +215,7 @@ class SecureMessagingSession:
                 self.sign_private_key,
                 ciphertext
             ),
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=time.time_ns(),
             message_id=message_id,
             previous_message_id=previous_id,
             nonce=nonce
@@ -220,6 +224,9 @@ class SecureMessagingSession:
         # Update message chain
         self.message_chain[session_id] = message_id
         
+        # Rotate session key in step with the recipient
+        session['key'] = _ratchet(session['key'])
+        
         return secure_message
     
     def decrypt_message(self, message: SecureMessage) -> str:
@@ -243,9 +250,11 @@ class SecureMessagingSession:
         if message.previous_message_id != self.message_chain.get(message.recipient_id):
             raise ValueError("Invalid message chain")
         
-        # Verify signature before decryption
+        # Verify signature before decryption; the peer's keys are stored
+        # as sender_keys or recipient_keys depending on who initiated
+        peer_keys = session.get('sender_keys') or session['recipient_keys']
         if not verify(
-            session['sender_keys']['sign_public_key'],
+            peer_keys['sign_public_key'],
             message.ciphertext,
             message.signature
         ):
@@ -262,7 +271,7 @@ class SecureMessagingSession:
         self.message_chain[message.recipient_id] = message.message_id
         
         # Rotate session key after successful decryption
-        session['key'] = hashlib.sha256(session['key']).digest()
+        session['key'] = _ratchet(session['key'])
         
         return plaintext.decode()
     
@@ -17,14 +17,34 @@ The API provides endpoints for:
 """
 
 from flask import Flask, request, jsonify
-from functools import wraps
+from flask.json.provider import DefaultJSONProvider
+from functools import lru_cache, wraps
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 import base64
 
-from src.kyber import generate_keys as kyber_keygen, encapsulate, decapsulate
-from src.dilithium import generate_keys as dilithium_keygen, sign, verify
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from src.kyber import (
+    generate_keys as kyber_keygen,
+    generate_keys_batch as kyber_keygen_batch,
+    encapsulate,
+    decapsulate
+)
+from src.dilithium import (
+    generate_keys as dilithium_keygen,
+    generate_keys_batch as dilithium_keygen_batch,
+    sign,
+    verify,
+    batch_verify
+)
 from src.utils import secure_random_bytes
 
 # In-memory storage (replace with database in production)
@@ -32,12 +52,18 @@ users: Dict[str, Dict] = {}
 messages: Dict[str, List[Dict]] = {}
 sessions: Dict[str, Dict] = {}
 
-def generate_user_keys() -> Dict:
-    """Generate quantum-resistant keys for a new user."""
-    enc_public_key, enc_private_key = kyber_keygen()
-    sign_private_key, sign_public_key = dilithium_keygen()
-    
-    # Convert keys to bytes for storage
+# Authentication timestamps older or newer than this many seconds are rejected
+AUTH_MAX_SKEW = 300
+
+# Number of pre-generated user key sets kept ready, and the level below
+# which the background thread tops the pool up again
+KEY_POOL_SIZE = 32
+KEY_POOL_LOW_WATER = 16
+
+def _user_keys(enc_keys: Tuple[Dict, Dict], sign_keys: Tuple[Dict, Dict]) -> Dict:
+    """Convert a Kyber and a Dilithium key pair to bytes for storage."""
+    enc_public_key, enc_private_key = enc_keys
+    sign_private_key, sign_public_key = sign_keys
     return {
         'enc_public_key': enc_public_key['seed'],
         'enc_private_key': enc_private_key['seed'],
@@ -45,6 +71,128 @@ def generate_user_keys() -> Dict:
         'sign_private_key': sign_private_key['key_seed']
     }
 
+def generate_user_keys() -> Dict:
+    """Generate quantum-resistant keys for a new user."""
+    return _user_keys(kyber_keygen(), dilithium_keygen())
+
+def generate_user_keys_batch(count: int) -> List[Dict]:
+    """Generate keys for several users using the batched key generators."""
+    return [
+        _user_keys(enc_keys, sign_keys)
+        for enc_keys, sign_keys in zip(kyber_keygen_batch(count),
+                                       dilithium_keygen_batch(count))
+    ]
+
+class KeyPool:
+    """
+    Pool of pre-generated user keys, refilled by a background thread.
+    
+    Taking keys from the pool keeps key generation off the request path;
+    when the pool runs dry, keys are generated inline instead.
+    """
+    
+    def __init__(self, size: int = KEY_POOL_SIZE, low_water: int = KEY_POOL_LOW_WATER):
+        self._keys: "queue.Queue[Dict]" = queue.Queue(maxsize=size)
+        self._low_water = low_water
+        self._refill = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+    
+    def start(self) -> None:
+        """Start the refill thread (once) and fill the pool."""
+        with self._lock:
+            if self._thread is None:
+                # Each thread gets its own stop flag, so a restart cannot
+                # revive a thread that is still shutting down
+                self._stopped = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stopped,),
+                    name='key-pool', daemon=True)
+                self._thread.start()
+        self._refill.set()
+    
+    def stop(self) -> None:
+        """Stop the refill thread and wait for it to exit."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stopped.set()
+            self._refill.set()
+        thread.join()
+    
+    def get(self) -> Dict:
+        """Take a key set from the pool, generating one if it is empty."""
+        try:
+            keys = self._keys.get_nowait()
+        except queue.Empty:
+            keys = generate_user_keys()
+        if self._keys.qsize() < self._low_water:
+            self._refill.set()
+        return keys
+    
+    def _run(self, stopped: threading.Event) -> None:
+        while True:
+            self._refill.wait()
+            if stopped.is_set():
+                return
+            self._refill.clear()
+            
+            # Top the pool up in one batch
+            missing = self._keys.maxsize - self._keys.qsize()
+            if missing <= 0:
+                continue
+            for keys in generate_user_keys_batch(missing):
+                try:
+                    self._keys.put_nowait(keys)
+                except queue.Full:
+                    break
+
+key_pool = KeyPool()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes and decodes with orjson.
+    
+    jsonify builds its response from dumps, so routes keep using it
+    unchanged; installed by create_app only when orjson is available.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def xor_bytes(data: bytes, key: bytes) -> bytes:
+    """XOR data with key as whole integers, truncated to the shorter input."""
+    length = min(len(data), len(key))
+    # Slice through memoryviews so neither input is copied
+    data_view = memoryview(data)[:length]
+    key_view = memoryview(key)[:length]
+    return (
+        int.from_bytes(data_view, 'big') ^ int.from_bytes(key_view, 'big')
+    ).to_bytes(length, 'big')
+
+@lru_cache(maxsize=1024)
+def _parse_timestamp(value: str) -> float:
+    """
+    Convert an authentication timestamp to epoch seconds.
+    
+    Accepts integer epoch seconds or an ISO 8601 string; ISO times
+    without a zone are taken as UTC, as produced by datetime.utcnow().
+    
+    Raises:
+        ValueError: If the timestamp cannot be parsed
+    """
+    if value.isdigit():
+        return float(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
 def require_auth(f):
     """Decorator to enforce quantum-resistant authentication."""
     @wraps(f)
@@ -66,8 +214,7 @@ def require_auth(f):
                 return jsonify({'error': 'User not found'}), 404
             
             # Verify timestamp is recent (within 5 minutes)
-            timestamp_dt = datetime.fromisoformat(timestamp)
-            if abs((datetime.utcnow() - timestamp_dt).total_seconds()) > 300:
+            if abs(time.time() - _parse_timestamp(timestamp)) > AUTH_MAX_SKEW:
                 return jsonify({'error': 'Authentication expired'}), 401
             
             # Verify signature
@@ -84,6 +231,11 @@ def require_auth(f):
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    
+    # Warm the key pool before the first request
+    key_pool.start()
     
     @app.route('/api/users', methods=['POST'])
     def create_user():
@@ -97,8 +249,8 @@ def create_app():
         if user_id in users:
             return jsonify({'error': 'User already exists'}), 409
         
-        # Generate keys
-        keys = generate_user_keys()
+        # Take pre-generated keys
+        keys = key_pool.get()
         users[user_id] = keys
         messages[user_id] = []
         
@@ -149,10 +301,7 @@ def create_app():
             
             # Encrypt message
             message_bytes = message_text.encode()
-            ciphertext = bytes([a ^ b for a, b in zip(
-                message_bytes,
-                encryption_key[:len(message_bytes)]
-            )])
+            ciphertext = xor_bytes(message_bytes, encryption_key)
             
             # Sign message
             signature = sign(
@@ -160,14 +309,15 @@ def create_app():
                 message_bytes
             )
             
-            # Store message
+            # Store message; binary fields stay raw bytes, since they
+            # are only ever read back in-process, never sent as JSON
             message_data = {
                 'id': message_id,
                 'sender_id': sender_id,
                 'timestamp': datetime.utcnow().isoformat(),
-                'key_ciphertext': key_ciphertext.hex(),
-                'ciphertext': base64.b64encode(ciphertext).decode(),
-                'signature': signature.hex()
+                'key_ciphertext': key_ciphertext,
+                'ciphertext': ciphertext,
+                'signature': signature
             }
             messages[recipient_id].append(message_data)
             
@@ -182,38 +332,43 @@ def create_app():
         """Get all messages for the authenticated user."""
         try:
             user_messages = messages.get(user_id, [])
-            decrypted_messages = []
             
+            # Decrypt every message first
+            plaintexts = []
             for msg in user_messages:
                 # Decrypt message key
-                key_ciphertext = bytes.fromhex(msg['key_ciphertext'])
                 encryption_key = decapsulate(
-                    key_ciphertext,
+                    msg['key_ciphertext'],
                     users[user_id]['enc_private_key']
                 )
                 
                 # Decrypt message
-                ciphertext = base64.b64decode(msg['ciphertext'])
-                message_bytes = bytes([a ^ b for a, b in zip(
-                    ciphertext,
-                    encryption_key[:len(ciphertext)]
-                )])
-                
-                # Verify signature
-                signature = bytes.fromhex(msg['signature'])
-                if not verify(
-                    users[msg['sender_id']]['sign_public_key'],
-                    message_bytes,
-                    signature
-                ):
-                    continue  # Skip messages with invalid signatures
-                
-                decrypted_messages.append({
+                plaintexts.append(xor_bytes(msg['ciphertext'], encryption_key))
+            
+            # Verify signatures in one batch per sender
+            by_sender: Dict[str, List[int]] = {}
+            for index, msg in enumerate(user_messages):
+                by_sender.setdefault(msg['sender_id'], []).append(index)
+            valid = [False] * len(user_messages)
+            for sender_id, indices in by_sender.items():
+                results = batch_verify(
+                    users[sender_id]['sign_public_key'],
+                    [(plaintexts[i], user_messages[i]['signature']) for i in indices]
+                )
+                for index, result in zip(indices, results):
+                    valid[index] = result
+            
+            # Skip messages with invalid signatures, keeping arrival order
+            decrypted_messages = [
+                {
                     'id': msg['id'],
                     'sender_id': msg['sender_id'],
                     'timestamp': msg['timestamp'],
                     'message': message_bytes.decode()
-                })
+                }
+                for msg, message_bytes, is_valid in zip(user_messages, plaintexts, valid)
+                if is_valid
+            ]
             
             return jsonify({'messages': decrypted_messages})
         
@@ -10,18 +10,25 @@ Key features:
 """
 
 import hashlib
-from typing import Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 
-from .dilithium import generate_keys as dilithium_generate_keys, sign, verify
-from .utils import secure_random_bytes
+from .dilithium import (
+    generate_keys as dilithium_generate_keys,
+    generate_keys_batch as dilithium_generate_keys_batch,
+    sign,
+    verify
+)
+from .utils import DATACLASS_SLOTS, secure_random_bytes
 
-@dataclass
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ProtectedTransaction:
     """
     Represents a Bitcoin transaction protected by quantum-resistant signatures.
     
+    Instances are immutable; use dataclasses.replace to derive a changed copy.
+    
     Attributes:
         tx_hash: Bitcoin transaction hash
         btc_pubkey: Bitcoin public key used in the transaction
@@ -33,17 +40,18 @@ class ProtectedTransaction:
     btc_pubkey: str
     quantum_pubkey: str
     quantum_signature: bytes
-    timestamp: str = datetime.utcnow().isoformat()
+    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
 
     def serialize(self) -> bytes:
         """Serialize transaction data for signing/verification."""
-        data = {
-            'tx_hash': self.tx_hash,
-            'btc_pubkey': self.btc_pubkey,
-            'quantum_pubkey': self.quantum_pubkey,
-            'timestamp': self.timestamp
-        }
-        return str(data).encode()
+        # Fixed field order; the hex keys/hash and ISO timestamp never
+        # contain the separator, so the encoding is unambiguous
+        return b'|'.join((
+            self.tx_hash.encode(),
+            self.btc_pubkey.encode(),
+            self.quantum_pubkey.encode(),
+            self.timestamp.encode()
+        ))
 
 class QuantumProtectedWallet:
     """
@@ -54,10 +62,17 @@ class QuantumProtectedWallet:
     quantum-resistant signatures.
     """
     
-    def __init__(self):
-        """Initialize a new hybrid wallet."""
+    def __init__(self, quantum_keypair: Optional[Tuple[Dict, Dict]] = None):
+        """
+        Initialize a new hybrid wallet.
+        
+        Args:
+            quantum_keypair: Optional pre-generated Dilithium (private, public) key pair
+        """
         # Generate quantum-resistant keys
-        self.quantum_private_key, self.quantum_public_key = dilithium_generate_keys()
+        self.quantum_private_key, self.quantum_public_key = (
+            quantum_keypair or dilithium_generate_keys()
+        )
         
         # In production, this would integrate with Bitcoin libraries
         # For now, we'll use mock Bitcoin credentials
@@ -67,6 +82,20 @@ class QuantumProtectedWallet:
         ).hexdigest()
         self.btc_address = f"1{self.btc_public_key[:39]}"  # Mock P2PKH address
     
+    @classmethod
+    def create_many(cls, count: int) -> List['QuantumProtectedWallet']:
+        """
+        Create several hybrid wallets, generating their quantum-resistant
+        keys in one batch.
+        
+        Args:
+            count: Number of wallets to create
+            
+        Returns:
+            List of new wallets
+        """
+        return [cls(keypair) for keypair in dilithium_generate_keys_batch(count)]
+    
     def protect_transaction(self, tx_hash: str) -> ProtectedTransaction:
         """
         Add quantum-resistant protection to a Bitcoin transaction.
@@ -88,14 +117,13 @@ class QuantumProtectedWallet:
             quantum_signature=b''  # Placeholder for signature
         )
         
-        # Sign the protection data
+        # Sign the protection data (the signature is not part of it)
         signature = sign(
             self.quantum_private_key,
             protected_tx.serialize()
         )
-        protected_tx.quantum_signature = signature
         
-        return protected_tx
+        return replace(protected_tx, quantum_signature=signature)
     
     def verify_protected_transaction(
         self, protected_tx: ProtectedTransaction
@@ -130,8 +158,11 @@ class QuantumProtectedWallet:
     @staticmethod
     def _is_valid_tx_hash(tx_hash: str) -> bool:
         """Validate Bitcoin transaction hash format."""
-        return (
-            isinstance(tx_hash, str) and
-            len(tx_hash) == 64 and
-            all(c in '0123456789abcdefABCDEF' for c in tx_hash)
-        ) 
\ No newline at end of file
+        if not isinstance(tx_hash, str) or len(tx_hash) != 64:
+            return False
+        # fromhex skips whitespace, so also require all 64 characters to
+        # have decoded into the 32-byte hash
+        try:
+            return len(bytes.fromhex(tx_hash)) == 32
+        except ValueError:
+            return False 
\ No newline at end of file
@@ -2,11 +2,17 @@
 Implementation of the Dilithium digital signature scheme.
 """
 
-import numpy as np
+from __future__ import annotations
+
 import hashlib
-from typing import Tuple, Dict, Optional
+import hmac
+from collections.abc import Mapping
+from typing import Tuple, Dict, List, Optional
 from . import utils
 
+# numpy is only loaded once key generation or polynomial arithmetic needs it
+np = utils.lazy_import('numpy')
+
 # Dilithium parameters (security level 2)
 DILITHIUM_N = 256
 DILITHIUM_Q = 8380417
@@ -18,8 +24,19 @@ DILITHIUM_K = 4
 DILITHIUM_L = 4
 DILITHIUM_ETA = 2
 
+# Extendable-output hash behind signatures, as in the spec, and the
+# size of the digest it produces
+HASH = hashlib.shake_256
+HASH_BYTES = 32
+
+# Messages up to this many bytes are joined with the key seed and nonce
+# and hashed in one call
+ONE_SHOT_HASH_LIMIT = 1 << 16
+
 class DilithiumParams:
     """Dilithium parameter set."""
+    __slots__ = ('n', 'q', 'd', 'tau', 'gamma1', 'gamma2', 'k', 'l', 'eta')
+    
     def __init__(self):
         self.n = DILITHIUM_N
         self.q = DILITHIUM_Q
@@ -31,69 +48,231 @@ class DilithiumParams:
         self.l = DILITHIUM_L
         self.eta = DILITHIUM_ETA
 
-def generate_keys(params: DilithiumParams = DilithiumParams()) -> Tuple[Dict, Dict]:
+# Parameters used when none are given
+_DEFAULT_PARAMS = DilithiumParams()
+
+class VerificationKey(Mapping):
+    """
+    Dilithium verification key packed into one contiguous buffer.
+    
+    Layout: rho (32 bytes) || key_seed (32 bytes) || A (k*l*n int32)
+    || t (k*n int32), with polynomial coefficients stored little-endian.
+    Components are exposed as read-only views, so the key still supports
+    dict-style access (key['t'], key.get('key_seed'), 'A' in key).
+    """
+    
+    FIELDS = ('rho', 'key_seed', 'A', 't')
+    SEED_BYTES = 32
+    
+    def __init__(self, buffer: bytes, params: Optional[DilithiumParams] = None):
+        """
+        Wrap a packed verification key.
+        
+        Args:
+            buffer: Packed key bytes
+            params: Dilithium parameters the key was generated with
+        
+        Raises:
+            ValueError: If the buffer length does not match the parameters
+        """
+        if params is None:
+            params = _DEFAULT_PARAMS
+        
+        self._a_count = params.k * params.l * params.n
+        self._t_count = params.k * params.n
+        expected = 2 * self.SEED_BYTES + 4 * (self._a_count + self._t_count)
+        if len(buffer) != expected:
+            raise ValueError(f"Verification key must be {expected} bytes")
+        self._buffer = bytes(buffer)
+        self._params = params
+    
+    @classmethod
+    def pack(cls, rho: bytes, key_seed: bytes, A: np.ndarray, t: np.ndarray,
+             params: Optional[DilithiumParams] = None) -> 'VerificationKey':
+        """Pack verification key components into a single buffer."""
+        buffer = b''.join((
+            rho,
+            key_seed,
+            np.ascontiguousarray(A, dtype='<i4').tobytes(),
+            np.ascontiguousarray(t, dtype='<i4').tobytes()
+        ))
+        return cls(buffer, params)
+    
+    def __getitem__(self, name: str):
+        seed = self.SEED_BYTES
+        if name == 'rho':
+            return self._buffer[:seed]
+        if name == 'key_seed':
+            return self._buffer[seed:2 * seed]
+        if name == 'A':
+            return np.frombuffer(self._buffer, dtype='<i4', count=self._a_count,
+                                 offset=2 * seed).reshape(
+                self._params.k, self._params.l, self._params.n)
+        if name == 't':
+            return np.frombuffer(self._buffer, dtype='<i4', count=self._t_count,
+                                 offset=2 * seed + 4 * self._a_count).reshape(
+                self._params.k, self._params.n)
+        raise KeyError(name)
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+    
+    def __bytes__(self) -> bytes:
+        return self._buffer
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, VerificationKey):
+            return self._buffer == other._buffer
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash(self._buffer)
+
+def generate_keys(params: Optional[DilithiumParams] = None) -> Tuple[Dict, VerificationKey]:
     """
     Generate a Dilithium key pair.
     
     Returns:
-        Tuple[Dict, Dict]: (signing_key, verification_key)
+        Tuple[Dict, VerificationKey]: (signing_key, verification_key)
+    """
+    return generate_keys_batch(1, params)[0]
+
+def generate_keys_batch(count: int,
+                        params: Optional[DilithiumParams] = None) -> List[Tuple[Dict, VerificationKey]]:
+    """
+    Generate several independent Dilithium key pairs at once.
+    
+    The randomness for all key pairs is sampled in one batch per
+    component, so creating many keys costs far fewer sampling calls
+    than repeated generate_keys() calls.
+    
+    Args:
+        count: Number of key pairs to generate
+        params: Dilithium parameters
+    
+    Returns:
+        List[Tuple[Dict, VerificationKey]]: (signing_key, verification_key) pairs
     """
-    # Generate seed for A
-    rho = utils.secure_random_bytes(32)
-    key_seed = utils.secure_random_bytes(32)
+    if params is None:
+        params = _DEFAULT_PARAMS
+    
+    # Generate seed for A and key seed for every key pair in a single draw
+    seeds = utils.secure_random_bytes(64 * count)
     
-    # Generate matrix A (k x l matrix of polynomials)
-    A = np.array([[utils.generate_matrix(1, params.n, params.q)[0] 
-                   for _ in range(params.l)]
-                  for _ in range(params.k)])
+    # Expand each key pair's matrix A (k x l polynomials) from its seed rho,
+    # filling a preallocated array so that count == 0 works too
+    A = np.empty((count, params.k, params.l, params.n), dtype=np.int64)
+    for i in range(count):
+        A[i] = utils.expand_seed(seeds[64 * i:64 * i + 32], params.k * params.l,
+                                 params.n, params.q).reshape(params.k, params.l, params.n)
     
     # Generate secret vectors s1 and s2
-    s1 = np.array([utils.generate_matrix(1, params.n, params.eta)[0] 
-                   for _ in range(params.l)])
-    s2 = np.array([utils.generate_matrix(1, params.n, params.eta)[0] 
-                   for _ in range(params.k)])
-    
-    # Compute public key t
-    t = np.zeros((params.k, params.n))
-    for i in range(params.k):
-        for j in range(params.l):
-            product = utils.polynomial_multiply(A[i][j], s1[j], params.q)
-            t[i] = (t[i] + product) % params.q
-    
-    signing_key = {
-        'rho': rho,
-        'key_seed': key_seed,
-        'A': A,
-        's1': s1,
-        's2': s2,
-        't': t
-    }
-    
-    verification_key = {
-        'rho': rho,
-        'key_seed': key_seed,
-        'A': A,
-        't': t
-    }
-    
-    return signing_key, verification_key
+    s1 = utils.generate_matrix(count * params.l, params.n, params.eta).reshape(
+        count, params.l, params.n)
+    s2 = utils.generate_matrix(count * params.k, params.n, params.eta).reshape(
+        count, params.k, params.n)
+    
+    # Compute public keys t = A·s1 for every key pair at once
+    t = _matrix_vector_multiply(A, s1, params)
+    
+    key_pairs = []
+    for i in range(count):
+        rho = seeds[64 * i:64 * i + 32]
+        key_seed = seeds[64 * i + 32:64 * (i + 1)]
+        
+        verification_key = VerificationKey.pack(rho, key_seed, A[i], t[i], params)
+        
+        # The signing key shares the packed public components
+        signing_key = {
+            'rho': rho,
+            'key_seed': key_seed,
+            'A': verification_key['A'],
+            's1': s1[i],
+            's2': s2[i],
+            't': verification_key['t']
+        }
+        
+        key_pairs.append((signing_key, verification_key))
+    
+    return key_pairs
+
+def _matrix_vector_multiply(A: np.ndarray, s: np.ndarray, params: DilithiumParams) -> np.ndarray:
+    """
+    Compute A·s for a k x l matrix and l-vector of polynomials.
+    
+    Leading batch axes are allowed, so the products for several key
+    pairs are computed together. Both operands are transformed to the
+    NTT domain once, multiplied and accumulated there, and only the k
+    result polynomials are transformed back.
+    """
+    A_hat = utils.ntt_transform(A, params.q)
+    s_hat = utils.ntt_transform(s, params.q)
+    t_hat = utils.ntt_multiply(A_hat, s_hat[..., None, :, :], params.q).sum(axis=-2)
+    return utils.intt_transform(t_hat % params.q, params.q)
 
 def compute_signature_hash(key_seed: bytes, message: bytes, nonce: bytes) -> bytes:
     """Helper function to compute signature hash."""
-    h = hashlib.sha256()
-    h.update(key_seed)
+    # Short inputs are hashed joined in a single call; long messages are
+    # fed incrementally rather than copied
+    if len(message) <= ONE_SHOT_HASH_LIMIT:
+        return HASH(b''.join((key_seed, message, nonce))).digest(HASH_BYTES)
+    h = HASH(key_seed)
     h.update(message)
     h.update(nonce)
-    return h.digest()
+    return h.digest(HASH_BYTES)
+
+def batch_verify(verification_key: Dict, items: List[Tuple[bytes, bytes]],
+                 params: Optional[DilithiumParams] = None) -> List[bool]:
+    """
+    Verify several signatures made with the same key.
+    
+    The hash state over the key is built once and shared by every
+    signature in the batch.
+    
+    Args:
+        verification_key: The signer's public key
+        items: (message, signature) pairs to verify
+        params: Dilithium parameters
+        
+    Returns:
+        List[bool]: Whether each signature is valid, in input order
+    """
+    try:
+        key_seed = verification_key.get('key_seed')
+    except AttributeError:
+        key_seed = None
+    if key_seed is None:
+        return [False] * len(items)
+    
+    prefix = HASH(key_seed)
+    results = []
+    for message, signature in items:
+        try:
+            if len(signature) != 64:  # 32 bytes nonce + 32 bytes signature
+                results.append(False)
+                continue
+            
+            # Resume from the shared key state, as in compute_signature_hash
+            h = prefix.copy()
+            h.update(message)
+            h.update(signature[:32])
+            results.append(hmac.compare_digest(signature[32:], h.digest(HASH_BYTES)))
+        except Exception:
+            results.append(False)
+    return results
 
 def sign(signing_key: Dict, message: bytes, 
-         params: DilithiumParams = DilithiumParams()) -> bytes:
+         params: Optional[DilithiumParams] = None) -> bytes:
     """
     Sign a message using the Dilithium signature scheme.
     
     Args:
         signing_key: The signer's private key
-        message: The message to sign
+        message: The message to sign (bytes, bytearray or memoryview;
+            hashed in place without copying)
         params: Dilithium parameters
         
     Returns:
@@ -117,7 +296,7 @@ def sign(signing_key: Dict, message: bytes,
         if message is None:
             raise ValueError("Message cannot be None")
             
-        if not isinstance(message, bytes):
+        if not isinstance(message, (bytes, bytearray, memoryview)):
             raise ValueError("Message must be bytes")
         
         # Compute signature hash
@@ -130,7 +309,7 @@ def sign(signing_key: Dict, message: bytes,
         return utils.secure_random_bytes(64)
 
 def verify(verification_key: Dict, message: bytes, signature: bytes,
-           params: DilithiumParams = DilithiumParams()) -> bool:
+           params: Optional[DilithiumParams] = None) -> bool:
     """
     Verify a Dilithium signature.
     
@@ -161,6 +340,6 @@ def verify(verification_key: Dict, message: bytes, signature: bytes,
         expected_signature = compute_signature_hash(key_seed, message, nonce)
         
         # Compare signatures in constant time
-        return utils.constant_time_compare(actual_signature, expected_signature)
+        return hmac.compare_digest(actual_signature, expected_signature)
     except:
         return False 
\ No newline at end of file
@@ -2,76 +2,127 @@
 Implementation of the Kyber key encapsulation mechanism (KEM).
 """
 
-import numpy as np
+from __future__ import annotations
+
 import hashlib
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional
 from . import utils
 
+# numpy is only loaded once key generation or polynomial arithmetic needs it
+np = utils.lazy_import('numpy')
+
 # Kyber parameters
 KYBER_K = 3  # Security parameter
 KYBER_N = 256  # Polynomial degree
 KYBER_Q = 3329  # Modulus
 KYBER_ETA = 2  # Noise parameter
 
+# Extendable-output hash behind shared-secret derivation, as in the spec
+HASH = hashlib.shake_256
+# Shared secret size in bytes
+SHARED_SECRET_BYTES = 32
+
 class KyberParams:
     """Kyber parameter set."""
+    __slots__ = ('k', 'n', 'q', 'eta')
+    
     def __init__(self, k: int = KYBER_K):
         self.k = k
         self.n = KYBER_N
         self.q = KYBER_Q
         self.eta = KYBER_ETA
 
-def generate_keys(params: KyberParams = KyberParams()) -> Tuple[Dict, Dict]:
+# Parameters used when none are given
+_DEFAULT_PARAMS = KyberParams()
+
+def generate_keys(params: Optional[KyberParams] = None) -> Tuple[Dict, Dict]:
     """
     Generate a Kyber key pair.
     
+    Args:
+        params: Kyber parameters
+    
     Returns:
         Tuple[Dict, Dict]: (public_key, private_key)
     """
-    # Generate random matrix A (k x k matrix of polynomials)
-    A = np.array([[utils.generate_matrix(1, params.n, params.q)[0] 
-                   for _ in range(params.k)]
-                  for _ in range(params.k)])
-    
-    # Generate secret vectors s and error e
-    s = np.array([utils.generate_matrix(1, params.n, params.eta)[0] 
-                  for _ in range(params.k)])
-    e = np.array([utils.generate_matrix(1, params.n, params.eta)[0] 
-                  for _ in range(params.k)])
-    
-    # Compute public key t = A·s + e
-    t = np.zeros((params.k, params.n))
-    for i in range(params.k):
-        for j in range(params.k):
-            product = utils.polynomial_multiply(A[i][j], s[j], params.q)
-            t[i] = (t[i] + product) % params.q
-        t[i] = (t[i] + e[i]) % params.q
-    
-    # Generate key derivation seed
-    key_seed = utils.secure_random_bytes(32)
-    
-    public_key = {
-        'A': A,
-        't': t,
-        'seed': key_seed  # Include seed in public key for shared secret derivation
-    }
+    return generate_keys_batch(1, params)[0]
+
+def generate_keys_batch(count: int, params: Optional[KyberParams] = None) -> List[Tuple[Dict, Dict]]:
+    """
+    Generate several independent Kyber key pairs at once.
     
-    private_key = {
-        's': s,
-        'seed': key_seed
-    }
+    The randomness for all key pairs is sampled in one batch per
+    component, so creating many keys costs far fewer sampling calls
+    than repeated generate_keys() calls.
     
-    return public_key, private_key
+    Args:
+        count: Number of key pairs to generate
+        params: Kyber parameters
+    
+    Returns:
+        List[Tuple[Dict, Dict]]: (public_key, private_key) pairs
+    """
+    if params is None:
+        params = _DEFAULT_PARAMS
+    
+    # Coefficients are stored in the narrowest type the arithmetic allows
+    dtype = utils.coefficient_dtype(params.q)
+    
+    # Generate random matrices A (k x k matrices of polynomials), sampled as one batch
+    A = utils.generate_matrix(count * params.k * params.k, params.n, params.q,
+                              dtype).reshape(count, params.k, params.k, params.n)
+    
+    # Generate secret vectors s and errors e
+    s = utils.generate_matrix(count * params.k, params.n, params.eta, dtype).reshape(
+        count, params.k, params.n)
+    e = utils.generate_matrix(count * params.k, params.n, params.eta, dtype).reshape(
+        count, params.k, params.n)
+    
+    # Generate key derivation seeds
+    seeds = utils.secure_random_bytes(32 * count)
+    
+    # Compute public keys t = A·s + e for every key pair at once
+    A_hat = utils.ntt_transform(A, params.q)
+    t = (_matrix_vector_multiply(A_hat, s, params) + e) % params.q
+    
+    key_pairs = []
+    for i in range(count):
+        key_seed = seeds[32 * i:32 * (i + 1)]
+        
+        public_key = {
+            'A': A[i],
+            't': t[i],
+            'seed': key_seed  # Include seed in public key for shared secret derivation
+        }
+        
+        private_key = {
+            's': s[i],
+            'seed': key_seed
+        }
+        
+        key_pairs.append((public_key, private_key))
+    
+    return key_pairs
+
+def _matrix_vector_multiply(A_hat: np.ndarray, s: np.ndarray, params: KyberParams) -> np.ndarray:
+    """
+    Compute A·s for a k x k matrix (given in the NTT domain) and k-vector
+    of polynomials.
+    
+    Works in the NTT domain (split down to degree-2 factors, as q = 3329
+    allows) and accepts leading batch axes for several key pairs.
+    """
+    s_hat = utils.ntt_transform(s, params.q)
+    t_hat = utils.ntt_multiply(A_hat, s_hat[..., None, :, :], params.q).sum(
+        axis=-2, dtype=A_hat.dtype)
+    return utils.intt_transform(t_hat % params.q, params.q)
 
 def derive_shared_secret(seed: bytes, message: bytes, nonce: bytes) -> bytes:
     """Helper function to derive a 32-byte shared secret."""
-    h = hashlib.sha256()
-    h.update(seed)
-    h.update(message)
-    h.update(nonce)
-    return h.digest()
+    # The inputs are short, so hash them joined in a single call
+    return HASH(b''.join((seed, message, nonce))).digest(SHARED_SECRET_BYTES)
 
-def encapsulate(public_key: Dict, params: KyberParams = KyberParams()) -> Tuple[Dict, bytes]:
+def encapsulate(public_key: Dict, params: Optional[KyberParams] = None) -> Tuple[Dict, bytes]:
     """
     Encapsulate a shared secret using a public key.
     
@@ -104,7 +155,7 @@ def encapsulate(public_key: Dict, params: KyberParams = KyberParams()) -> Tuple[
     return ciphertext, shared_secret
 
 def decapsulate(ciphertext: Dict, private_key: Dict, 
-                params: KyberParams = KyberParams()) -> bytes:
+                params: Optional[KyberParams] = None) -> bytes:
     """
     Decapsulate a shared secret using a private key and ciphertext.
     
@@ -2,9 +2,52 @@
 Utility functions for quantum-resistant cryptographic operations.
 """
 
+from __future__ import annotations
+
+import hashlib
+import hmac
+import importlib.util
 import secrets
-import numpy as np
-from typing import Union, List, Tuple
+import sys
+import types
+from functools import lru_cache
+from typing import Union, List, Optional, Tuple
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access."""
+    
+    def __getattr__(self, attr: str):
+        # import_module holds the import lock for the module, so threads
+        # racing on first use all get the fully executed module
+        module = importlib.import_module(self.__name__)
+        # Copy the namespace so later lookups no longer reach __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Import a module on first attribute access instead of right away.
+    
+    Lets modules that only need numpy for key generation and polynomial
+    arithmetic be imported without paying for numpy up front. If the
+    module is already imported, it is returned as is. Unlike
+    importlib.util.LazyLoader, first use is safe from several threads.
+    
+    Raises:
+        ImportError: If the module cannot be found
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named {name!r}")
+    return _LazyModule(name)
+
+# Loaded on first use; see lazy_import
+np = lazy_import('numpy')
+
+# Dataclass options giving instances __slots__ instead of a __dict__ (3.10+)
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
 def secure_random_bytes(length: int) -> bytes:
     """Generate cryptographically secure random bytes.
@@ -19,44 +62,57 @@ def secure_random_bytes(length: int) -> bytes:
 
 def secure_random_int(min_val: int, max_val: int) -> int:
     """Generate a cryptographically secure random integer in the range [min_val, max_val]."""
-    return secrets.randbelow(max_val - min_val + 1) + min_val
+    span = max_val - min_val + 1
+    # randbelow draws one bit more than a power-of-two span needs and
+    # rejects half of its draws; masked random bits are uniform already.
+    # A span of 1 goes to randbelow: randbits(0) raises before Python 3.9
+    if span > 1 and span & (span - 1) == 0:
+        return secrets.randbits(span.bit_length() - 1) + min_val
+    return secrets.randbelow(span) + min_val
 
 def bytes_to_bits(data: bytes) -> List[int]:
-    """Convert bytes to a list of bits."""
-    result = []
-    for byte in data:
-        for i in range(8):
-            result.append((byte >> (7 - i)) & 1)
-    return result
+    """Convert bytes to a list of bits, most significant bit first."""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).tolist()
 
 def bits_to_bytes(bits: List[int]) -> bytes:
-    """Convert a list of bits to bytes."""
-    result = []
-    for i in range(0, len(bits), 8):
-        byte = 0
-        for j in range(min(8, len(bits) - i)):
-            byte |= bits[i + j] << (7 - j)
-        result.append(byte)
-    return bytes(result)
+    """Convert a list of bits to bytes, zero-padding the last byte."""
+    return np.packbits(np.asarray(bits, dtype=np.uint8)).tobytes()
 
 def constant_time_compare(a: bytes, b: bytes) -> bool:
     """Compare two byte strings in constant time to prevent timing attacks."""
-    if len(a) != len(b):
-        return False
-    result = 0
-    for x, y in zip(a, b):
-        result |= x ^ y
-    return result == 0
+    return hmac.compare_digest(a, b)
 
-def generate_matrix(rows: int, cols: int, modulus: int) -> np.ndarray:
-    """Generate a random matrix with elements in [0, modulus)."""
-    return np.array([
-        [secure_random_int(0, modulus - 1) for _ in range(cols)]
-        for _ in range(rows)
-    ])
+def generate_matrix(rows: int, cols: int, modulus: int,
+                    dtype: Optional[type] = None) -> np.ndarray:
+    """
+    Generate a random matrix with elements in [0, modulus).
+    
+    All elements are drawn from the system CSPRNG in one batch and
+    reduced with vectorized rejection sampling, so the result stays
+    uniform without a Python-level call per element. Elements are int64
+    unless another dtype is given.
+    """
+    if dtype is None:
+        dtype = np.int64
+    count = rows * cols
+    # Only 32-bit values below the largest multiple of modulus are unbiased
+    limit = (1 << 32) - (1 << 32) % modulus
+    values = np.empty(0, dtype=np.uint32)
+    while len(values) < count:
+        # Draw a few spare words so one pass almost always suffices
+        draw = np.frombuffer(secure_random_bytes(4 * (count - len(values) + 16)), dtype='<u4')
+        values = np.concatenate((values, draw[draw < limit]))
+    return (values[:count] % modulus).astype(dtype).reshape(rows, cols)
 
+@lru_cache(maxsize=8)
 def find_primitive_root(modulus: int) -> int:
-    """Find a primitive root modulo n."""
+    """
+    Find a primitive root modulo n.
+    
+    Results are cached, so the trial-division search runs once per
+    modulus. The Kyber and Dilithium primes return their standard 2-power
+    roots of unity (17 and 1753) rather than a generator.
+    """
     if modulus == 3329:  # Kyber prime
         return 17
     elif modulus == 8380417:  # Dilithium prime
@@ -89,17 +145,13 @@ def find_primitive_root(modulus: int) -> int:
     return a
 
 def mod_inverse(a: int, m: int) -> int:
-    """Calculate the modular multiplicative inverse of a modulo m."""
-    def extended_gcd(a: int, b: int) -> Tuple[int, int, int]:
-        if a == 0:
-            return b, 0, 1
-        gcd, x1, y1 = extended_gcd(b % a, a)
-        x = y1 - (b // a) * x1
-        y = x1
-        return gcd, x, y
-
-    _, x, _ = extended_gcd(a, m)
-    return (x % m + m) % m
+    """
+    Calculate the modular multiplicative inverse of a modulo m.
+    
+    Raises:
+        ValueError: If a has no inverse modulo m
+    """
+    return pow(a, -1, m)
 
 def bit_reverse(x: int, bits: int) -> int:
     """Reverse the bits of x."""
@@ -109,9 +161,116 @@ def bit_reverse(x: int, bits: int) -> int:
         x >>= 1
     return result
 
+def expand_seed(seed: bytes, rows: int, cols: int, modulus: int,
+                dtype: Optional[type] = None) -> np.ndarray:
+    """
+    Deterministically expand a seed into a matrix with elements in [0, modulus).
+    
+    The seed is stretched with the SHAKE-128 XOF and reduced with the
+    same rejection sampling as generate_matrix, in the style of the
+    ExpandA step of Kyber and Dilithium: the same seed always yields the
+    same matrix, so it can stand in for the matrix itself.
+    
+    Args:
+        seed: Seed bytes
+        rows: Number of rows
+        cols: Number of columns
+        modulus: Exclusive upper bound of the elements
+        dtype: Element type of the result (int64 by default)
+    
+    Returns:
+        Matrix of shape (rows, cols)
+    """
+    if dtype is None:
+        dtype = np.int64
+    count = rows * cols
+    limit = (1 << 32) - (1 << 32) % modulus
+    xof = hashlib.shake_128(seed)
+    words = count + 16
+    while True:
+        # XOF output is prefix-stable, so a longer squeeze only appends
+        draw = np.frombuffer(xof.digest(4 * words), dtype='<u4')
+        values = draw[draw < limit]
+        if len(values) >= count:
+            return (values[:count] % modulus).astype(dtype).reshape(rows, cols)
+        words *= 2
+
+def coefficient_dtype(modulus: int) -> type:
+    """
+    Narrowest signed integer type that holds products of two residues.
+    
+    Kyber's q = 3329 fits int32 end to end, which halves memory traffic
+    compared with int64; Dilithium's q = 8380417 needs int64 products.
+    """
+    return np.int32 if (modulus - 1) ** 2 < 1 << 31 else np.int64
+
+@lru_cache(maxsize=None)
+def _ntt_tables(modulus: int, n: int) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Precompute the twiddle factors of the negacyclic NTT for (modulus, n).
+    
+    The transform splits x^n + 1 for as many levels as the 2-power roots
+    of unity modulo the prime allow: completely when 2n divides
+    modulus - 1 (Dilithium), and down to degree-2 factors for Kyber's
+    q = 3329, which only has 256th roots of unity.
+    
+    Returns:
+        Tuple of (levels, zetas, inverse zetas, factor roots), where zetas
+        are in bit-reversed order and factor root i is the constant g_i
+        of the i-th final factor x^(n / 2^levels) - g_i
+    """
+    if n & (n - 1) != 0:
+        raise ValueError("Length must be a power of 2")
+    
+    # Number of levels: the largest L with a root of unity of order 2^(L+1)
+    log_n = n.bit_length() - 1
+    levels = 0
+    while levels < log_n and (modulus - 1) % (1 << (levels + 2)) == 0:
+        levels += 1
+    
+    # Root of unity of order 2^(levels+1). The known constants for the
+    # Kyber and Dilithium primes are roots of unity of order 2^k rather
+    # than generators, so those are squared down to the order needed
+    order = 1 << (levels + 1)
+    root = find_primitive_root(modulus)
+    two_adic = (modulus - 1) & -(modulus - 1)
+    if pow(root, two_adic, modulus) == 1:
+        while pow(root, order // 2, modulus) != modulus - 1:
+            root = root * root % modulus
+    else:
+        root = pow(root, (modulus - 1) // order, modulus)
+    
+    # Tables share the coefficient type so products do not upcast
+    dtype = coefficient_dtype(modulus)
+    exponents = [bit_reverse(i, levels) for i in range(1 << levels)]
+    zetas = np.array([pow(root, e, modulus) for e in exponents], dtype=dtype)
+    zetas_inv = np.array([pow(root, -e, modulus) for e in exponents], dtype=dtype)
+    factor_roots = np.array([pow(root, 2 * e + 1, modulus) for e in exponents],
+                            dtype=dtype)
+    for table in (zetas, zetas_inv, factor_roots):
+        table.flags.writeable = False
+    return levels, zetas, zetas_inv, factor_roots
+
+@lru_cache(maxsize=None)
+def _intt_scale(modulus: int, n: int) -> Tuple[int, int]:
+    """
+    Constants for the last level of the inverse NTT.
+    
+    Returns:
+        Tuple of (2^(-levels) mod modulus, the last level's inverse zeta
+        multiplied by that scale)
+    """
+    levels, _, zetas_inv, _ = _ntt_tables(modulus, n)
+    scale = pow(1 << levels, -1, modulus)
+    return scale, int(zetas_inv[1]) * scale % modulus
+
 def ntt_transform(poly: np.ndarray, modulus: int) -> np.ndarray:
     """
-    Compute the Number Theoretic Transform (NTT) of a polynomial.
+    Compute the negacyclic Number Theoretic Transform (NTT) of a polynomial.
+    
+    The transform is applied along the last axis, so a stack of
+    polynomials can be transformed in a single call. Twiddle factors are
+    computed once per (modulus, length) and reused.
     
     Args:
         poly: Polynomial coefficients
@@ -120,38 +279,39 @@ def ntt_transform(poly: np.ndarray, modulus: int) -> np.ndarray:
     Returns:
         NTT transformed polynomial
     """
-    n = len(poly)
-    if n & (n - 1) != 0:
-        raise ValueError("Length must be a power of 2")
+    n = np.shape(poly)[-1]
+    levels, zetas, _, _ = _ntt_tables(modulus, n)
     
-    # Find primitive root and generate powers
-    g = find_primitive_root(modulus)
-    omega = pow(g, (modulus - 1) // n, modulus)
+    # Initialize result array
+    result = np.asarray(poly, dtype=coefficient_dtype(modulus)) % modulus
+    batch = result.shape[:-1]
     
-    # Precompute powers of omega
-    omegas = np.array([pow(omega, i, modulus) for i in range(n)], dtype=int)
+    # Sums and differences grow by less than modulus per level when left
+    # unreduced, so while levels * modulus^2 fits the coefficient type
+    # only the twiddle products need reducing, plus once at the end
+    lazy = levels * modulus * modulus <= np.iinfo(result.dtype).max
     
-    # Initialize result array
-    result = poly.copy()
-    
-    # Cooley-Tukey FFT algorithm
-    for s in range(int(np.log2(n))):
-        m = 1 << s
-        for k in range(0, n, 2 * m):
-            for j in range(m):
-                idx1 = k + j
-                idx2 = k + j + m
-                u = result[idx1]
-                v = (result[idx2] * omegas[j * (n // (2 * m))]) % modulus
-                result[idx1] = (u + v) % modulus
-                result[idx2] = (u - v) % modulus
+    # Cooley-Tukey butterflies, every block of a level at once
+    for s in range(levels):
+        blocks = result.reshape(batch + (1 << s, 2, n >> (s + 1)))
+        u = blocks[..., 0, :]
+        v = (blocks[..., 1, :] * zetas[1 << s:2 << s, None]) % modulus
+        if lazy:
+            blocks[..., 0, :], blocks[..., 1, :] = u + v, u - v
+        else:
+            blocks[..., 0, :], blocks[..., 1, :] = (u + v) % modulus, (u - v) % modulus
     
+    if lazy:
+        result %= modulus
     return result
 
 def intt_transform(poly: np.ndarray, modulus: int) -> np.ndarray:
     """
     Compute the Inverse Number Theoretic Transform (INTT) of a polynomial.
     
+    The transform is applied along the last axis, so a stack of
+    polynomials can be transformed in a single call.
+    
     Args:
         poly: NTT transformed polynomial
         modulus: Prime modulus
@@ -159,39 +319,85 @@ def intt_transform(poly: np.ndarray, modulus: int) -> np.ndarray:
     Returns:
         Original polynomial coefficients
     """
-    n = len(poly)
-    if n & (n - 1) != 0:
-        raise ValueError("Length must be a power of 2")
+    n = np.shape(poly)[-1]
+    levels, _, zetas_inv, _ = _ntt_tables(modulus, n)
     
-    # Find primitive root and generate powers
-    g = find_primitive_root(modulus)
-    omega = pow(g, (modulus - 1) // n, modulus)
-    omega_inv = pow(omega, -1, modulus)
-    n_inv = pow(n, -1, modulus)
+    # Initialize result array
+    result = np.asarray(poly, dtype=coefficient_dtype(modulus)) % modulus
+    batch = result.shape[:-1]
     
-    # Precompute inverse powers of omega
-    omegas_inv = np.array([pow(omega_inv, i, modulus) for i in range(n)], dtype=int)
+    # Gentleman-Sande butterflies, undoing the levels in reverse order
+    for s in range(levels - 1, 0, -1):
+        blocks = result.reshape(batch + (1 << s, 2, n >> (s + 1)))
+        u = blocks[..., 0, :]
+        v = blocks[..., 1, :]
+        blocks[..., 0, :], blocks[..., 1, :] = (
+            (u + v) % modulus,
+            ((u - v) * zetas_inv[1 << s:2 << s, None]) % modulus,
+        )
     
-    # Initialize result array
-    result = poly.copy()
-    
-    # Gentleman-Sande FFT algorithm
-    for s in range(int(np.log2(n)) - 1, -1, -1):
-        m = 1 << s
-        for k in range(0, n, 2 * m):
-            for j in range(m):
-                idx1 = k + j
-                idx2 = k + j + m
-                u = result[idx1]
-                v = result[idx2]
-                result[idx1] = (u + v) % modulus
-                result[idx2] = ((u - v) * omegas_inv[j * (n // (2 * m))]) % modulus
-    
-    # Scale by n^(-1)
-    result = (result * n_inv) % modulus
+    # Last level, with the scaling by 2^(-levels) folded into both halves;
+    # the sum is shifted into (-modulus, modulus) so its product with the
+    # scale stays below modulus^2 like the difference's
+    if levels:
+        scale, scaled_zeta = _intt_scale(modulus, n)
+        blocks = result.reshape(batch + (2, n >> 1))
+        u = blocks[..., 0, :]
+        v = blocks[..., 1, :]
+        blocks[..., 0, :], blocks[..., 1, :] = (
+            ((u + v - modulus) * scale) % modulus,
+            ((u - v) * scaled_zeta) % modulus,
+        )
     
     return result
 
+def ntt_multiply(a: np.ndarray, b: np.ndarray, modulus: int) -> np.ndarray:
+    """
+    Multiply polynomials that are already in the NTT domain.
+    
+    Fully split transforms multiply point-wise; otherwise each block is
+    multiplied modulo its factor x^d - g_i. Inputs broadcast like NumPy
+    arrays, so a matrix and a vector of polynomials can be multiplied in
+    a single call.
+    
+    Args:
+        a: First NTT transformed polynomial(s)
+        b: Second NTT transformed polynomial(s)
+        modulus: Prime modulus
+    
+    Returns:
+        NTT transformed product(s)
+    """
+    n = np.shape(a)[-1]
+    levels, _, _, factor_roots = _ntt_tables(modulus, n)
+    d = n >> levels
+    if d == 1:
+        return (np.asarray(a) * np.asarray(b)) % modulus
+    
+    a = np.asarray(a).reshape(np.shape(a)[:-1] + (1 << levels, d))
+    b = np.asarray(b).reshape(np.shape(b)[:-1] + (1 << levels, d))
+    
+    if d == 2:
+        # Kyber's degree-2 factors, with the even and odd coefficients as
+        # strided views: (a0 + a1 x)(b0 + b1 x) mod x^2 - g
+        result = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=coefficient_dtype(modulus))
+        a0, a1, b0, b1 = a[..., 0], a[..., 1], b[..., 0], b[..., 1]
+        result[..., 0] = (a0 * b0 % modulus + (a1 * b1 % modulus) * factor_roots) % modulus
+        result[..., 1] = (a0 * b1 % modulus + a1 * b0 % modulus) % modulus
+        return result.reshape(result.shape[:-2] + (n,))
+    
+    result = np.zeros(np.broadcast_shapes(a.shape, b.shape), dtype=coefficient_dtype(modulus))
+    
+    # Schoolbook product of the small blocks, one whole row per
+    # coefficient of a: x^i * b is b rotated by i, with the coefficients
+    # that pass x^d folded back in multiplied by g_i
+    wrapped = (b * factor_roots[:, None]) % modulus
+    for i in range(d):
+        shifted = np.concatenate((wrapped[..., d - i:], b[..., :d - i]), axis=-1)
+        result = (result + a[..., i, None] * shifted) % modulus
+    
+    return result.reshape(result.shape[:-2] + (n,))
+
 def polynomial_multiply(a: np.ndarray, b: np.ndarray, modulus: int) -> np.ndarray:
     """
     Multiply two polynomials modulo x^n + 1 using NTT.
@@ -203,27 +409,16 @@ def polynomial_multiply(a: np.ndarray, b: np.ndarray, modulus: int) -> np.ndarra
     
     Returns:
         Product polynomial coefficients
+    
+    Raises:
+        ValueError: If the polynomials differ in length or their length
+            is not a power of 2
     """
-    n = len(a)
-    if n != len(b):
+    if len(a) != len(b):
         raise ValueError("Polynomials must have same length")
     
-    # Find next power of 2
-    n_padded = 1
-    while n_padded < n:
-        n_padded *= 2
-    
-    # Pad polynomials
-    a_padded = np.pad(a, (0, n_padded - n))
-    b_padded = np.pad(b, (0, n_padded - n))
-    
-    # Transform to NTT domain
-    a_ntt = ntt_transform(a_padded, modulus)
-    b_ntt = ntt_transform(b_padded, modulus)
-    
-    # Multiply point-wise
-    c_ntt = (a_ntt * b_ntt) % modulus
+    # Transform both operands to the NTT domain in one batched call
+    a_ntt, b_ntt = ntt_transform(np.stack((a, b)), modulus)
     
-    # Transform back and truncate
-    result = intt_transform(c_ntt, modulus)
-    return result[:n] 
\ No newline at end of file
+    # Multiply in the NTT domain and transform back
+    return intt_transform(ntt_multiply(a_ntt, b_ntt, modulus), modulus)
@@ -118,6 +118,12 @@ class TestBitcoinProtection(unittest.TestCase):
             protected_tx.serialize(),
             same_tx.serialize()
         )
+    
+    def test_timestamp_per_transaction(self):
+        """Test that each transaction records when it was protected."""
+        before = datetime.utcnow().isoformat()
+        protected_tx = self.wallet.protect_transaction(self.valid_tx_hash)
+        self.assertGreaterEqual(protected_tx.timestamp, before)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -4,7 +4,17 @@ Tests for the Dilithium digital signature scheme.
 
 import unittest
 import numpy as np
-from src.dilithium import generate_keys, sign, verify, DilithiumParams, compute_signature_hash
+from src.dilithium import (
+    generate_keys,
+    generate_keys_batch,
+    sign,
+    verify,
+    batch_verify,
+    DilithiumParams,
+    VerificationKey,
+    compute_signature_hash
+)
+from src.utils import expand_seed
 
 class TestDilithium(unittest.TestCase):
     def setUp(self):
@@ -44,6 +54,62 @@ class TestDilithium(unittest.TestCase):
         self.assertEqual(signing_key['A'].shape[1], self.params.l)
         self.assertEqual(signing_key['t'].shape[0], self.params.k)
     
+    def test_verification_key_packing(self):
+        """Test that the packed verification key round-trips through bytes."""
+        signing_key, verification_key = generate_keys(self.params)
+        
+        restored = VerificationKey(bytes(verification_key), self.params)
+        self.assertEqual(restored, verification_key)
+        self.assertEqual(restored['rho'], signing_key['rho'])
+        self.assertEqual(restored['key_seed'], signing_key['key_seed'])
+        self.assertTrue(np.array_equal(restored['A'], signing_key['A']))
+        self.assertTrue(np.array_equal(restored['t'], signing_key['t']))
+        
+        # Truncated buffers are rejected
+        with self.assertRaises(ValueError):
+            VerificationKey(bytes(verification_key)[:-1], self.params)
+    
+    def test_batch_key_generation(self):
+        """Test generating several independent key pairs at once."""
+        key_pairs = generate_keys_batch(3, self.params)
+        self.assertEqual(len(key_pairs), 3)
+        
+        # Each key pair has its own seed
+        seeds = {signing_key['key_seed'] for signing_key, _ in key_pairs}
+        self.assertEqual(len(seeds), 3)
+        
+        for signing_key, verification_key in key_pairs:
+            self.assertEqual(signing_key['A'].shape, (self.params.k, self.params.l, self.params.n))
+            self.assertEqual(signing_key['t'].shape, (self.params.k, self.params.n))
+            
+            signature = sign(signing_key, self.test_message, self.params)
+            self.assertTrue(verify(verification_key, self.test_message, signature, self.params))
+            
+            # A is reproducible from the public seed rho
+            expanded = expand_seed(signing_key['rho'], self.params.k * self.params.l,
+                                   self.params.n, self.params.q)
+            self.assertTrue(np.array_equal(
+                verification_key['A'], expanded.reshape(verification_key['A'].shape)))
+        
+        # An empty batch yields no key pairs
+        self.assertEqual(generate_keys_batch(0, self.params), [])
+    
+    def test_batch_verification(self):
+        """Test verifying several signatures from one key at once."""
+        signing_key, verification_key = generate_keys(self.params)
+        messages = [b"first", b"second", b"third"]
+        items = [(m, sign(signing_key, m, self.params)) for m in messages]
+        
+        # Swap in a wrong message and a truncated signature
+        items.append((b"other", items[0][1]))
+        items.append((b"first", items[0][1][:10]))
+        
+        self.assertEqual(
+            batch_verify(verification_key, items, self.params),
+            [True, True, True, False, False]
+        )
+        self.assertEqual(batch_verify({}, items[:1], self.params), [False])
+    
     def test_signature_generation(self):
         """Test signature generation."""
         signing_key, _ = generate_keys(self.params)
@@ -143,6 +209,12 @@ class TestDilithium(unittest.TestCase):
         signature = sign(signing_key, None, self.params)
         self.assertEqual(len(signature), 64)
 
+    def test_buffer_message(self):
+        """Test signing a message passed as a memoryview."""
+        signing_key, verification_key = generate_keys(self.params)
+        signature = sign(signing_key, memoryview(self.test_message), self.params)
+        self.assertTrue(verify(verification_key, self.test_message, signature, self.params))
+
     def test_signature_hash_computation(self):
         """Test the signature hash computation."""
         key_seed = b"test_key_seed"
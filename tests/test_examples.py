@@ -5,29 +5,46 @@ This test suite verifies:
 1. Blockchain example functionality
 2. Secure messaging example
 3. Web API example
-4. Secure file storage example
+
+The secure file storage example has its own suite in
+test_secure_file_storage.py.
 """
 
 import unittest
-import tempfile
-import shutil
-from pathlib import Path
 from datetime import datetime, timedelta
 import json
 import base64
+import queue
+import subprocess
+import sys
+from pathlib import Path
 
-from examples.blockchain_example import QuantumResistantWallet, QuantumResistantTransaction
+from src.kyber import generate_keys_batch as kyber_keygen_batch
+from src.dilithium import generate_keys_batch as dilithium_keygen_batch
+from examples.blockchain_example import (
+    QuantumResistantWallet,
+    QuantumResistantTransaction,
+    QuantumResistantBlock,
+    _mine_worker
+)
 from examples.secure_messaging import SecureMessagingSession
-from examples.web_api_example import create_app, generate_user_keys, users, messages
-from examples.secure_file_storage import SecureFileStorage, FileMetadata
+from examples.web_api_example import (
+    create_app, generate_user_keys, users, messages, KeyPool, key_pool
+)
 
 class TestBlockchainExample(unittest.TestCase):
     """Test suite for the blockchain example."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Generate the wallets' key pairs once for the whole suite."""
+        cls.keypairs = list(zip(kyber_keygen_batch(2), dilithium_keygen_batch(2)))
+    
     def setUp(self):
         """Set up test environment."""
-        self.alice = QuantumResistantWallet()
-        self.bob = QuantumResistantWallet()
+        # Fresh wallets, so caches and nonce pools are not shared
+        self.alice = QuantumResistantWallet(*self.keypairs[0])
+        self.bob = QuantumResistantWallet(*self.keypairs[1])
     
     def test_transaction_creation(self):
         """Test creating and signing transactions."""
@@ -59,6 +76,127 @@ class TestBlockchainExample(unittest.TestCase):
         with self.assertRaises(ValueError):
             signed_tx = self.alice.sign_transaction(tx)
     
+    def test_resign_transaction(self):
+        """Test that re-signing an unchanged transaction is consistent."""
+        tx = self.alice.create_transaction(self.bob.address, 100)
+        first_signature = tx.signature
+        
+        # Signing the same payload again reuses the signature
+        self.alice.sign_transaction(tx)
+        self.assertEqual(tx.signature, first_signature)
+        
+        # A changed payload gets a fresh, valid signature
+        tx.amount = 50
+        self.alice.sign_transaction(tx)
+        self.assertNotEqual(tx.signature, first_signature)
+        self.assertTrue(
+            QuantumResistantTransaction.verify_transaction(tx)
+        )
+    
+    def test_serialization_without_orjson(self):
+        """Test that signed bytes do not depend on orjson being installed."""
+        # orjson would write the amount as 1e-8, the stdlib as 1e-08
+        tx = QuantumResistantTransaction(
+            sender=bytes(20), recipient=bytes(20), amount=1e-8, timestamp=1)
+        self.assertIn(b'"amount":1e-08', tx.serialize())
+        
+        # Serialize the same transaction in a process where orjson cannot
+        # be imported, and in one where it can
+        code = (
+            "import sys\n"
+            "if sys.argv[1] == 'blocked':\n"
+            "    sys.modules['orjson'] = None\n"
+            "from examples.blockchain_example import QuantumResistantTransaction\n"
+            "tx = QuantumResistantTransaction(sender=bytes(20), recipient=bytes(20),\n"
+            "                                 amount=1e-8, timestamp=1)\n"
+            "sys.stdout.write(tx.serialize().hex())\n"
+        )
+        root = Path(__file__).resolve().parent.parent
+        for mode in ('blocked', 'available'):
+            with self.subTest(orjson=mode):
+                output = subprocess.run(
+                    [sys.executable, '-c', code, mode], cwd=root,
+                    capture_output=True, text=True, check=True).stdout
+                self.assertEqual(bytes.fromhex(output), tx.serialize())
+    
+    def test_tampered_transaction(self):
+        """Test that modifying a signed transaction invalidates it."""
+        tx = self.alice.create_transaction(self.bob.address, 100)
+        original_hash = tx.hash
+        
+        # Tamper with a signed field after signing
+        tx.amount = 1000
+        
+        self.assertNotEqual(tx.hash, original_hash)
+        self.assertFalse(
+            QuantumResistantTransaction.verify_transaction(tx)
+        )
+    
+    def test_block_mining(self):
+        """Test that mining finds a hash with the required prefix."""
+        tx = self.alice.create_transaction(self.bob.address, 100)
+        block = QuantumResistantBlock(
+            transactions=[tx],
+            previous_hash="0" * 64
+        )
+        block.mine(difficulty=2)
+        
+        self.assertTrue(block.compute_hash().startswith("00"))
+    
+    def test_parallel_block_mining(self):
+        """Test that parallel mining finds a hash with the required prefix."""
+        tx = self.alice.create_transaction(self.bob.address, 100)
+        block = QuantumResistantBlock(
+            transactions=[tx],
+            previous_hash="0" * 64
+        )
+        block.mine_parallel(difficulty=2, workers=2)
+        
+        self.assertTrue(block.compute_hash().startswith("00"))
+    
+    def test_mining_invalid_difficulty(self):
+        """Test that invalid difficulties are rejected before mining."""
+        tx = self.alice.create_transaction(self.bob.address, 100)
+        block = QuantumResistantBlock(
+            transactions=[tx],
+            previous_hash="0" * 64
+        )
+        for difficulty in (-1, 65, 2.5):
+            with self.assertRaises(ValueError):
+                block.mine(difficulty=difficulty)
+            with self.assertRaises(ValueError):
+                block.mine_parallel(difficulty=difficulty, workers=2)
+    
+    def test_mine_worker_reports_errors(self):
+        """Test that a failing mining worker reports its exception."""
+        found = queue.Queue()
+        _mine_worker(b'{"nonce":', 0, 1, 65, found)
+        
+        self.assertIsInstance(found.get_nowait(), ValueError)
+    
+    def test_chain_validation(self):
+        """Test that block links are checked across a chain."""
+        blocks = []
+        previous_hash = "0" * 64
+        for height, amount in enumerate((1, 2, 3)):
+            tx = self.alice.create_transaction(self.bob.address, amount)
+            block = QuantumResistantBlock(
+                transactions=[tx],
+                previous_hash=previous_hash,
+                height=height
+            )
+            blocks.append(block)
+            previous_hash = block.compute_hash()
+        
+        self.assertTrue(QuantumResistantBlock.validate_chain(blocks))
+        
+        # Blocks out of height order are rejected
+        self.assertFalse(QuantumResistantBlock.validate_chain([blocks[0], blocks[2]]))
+        
+        # Changing an earlier block breaks the link to the next one
+        blocks[1].transactions[0].amount = 1000
+        self.assertFalse(QuantumResistantBlock.validate_chain(blocks))
+    
     def test_encrypted_messaging(self):
         """Test encrypted messaging between wallets."""
         # Send encrypted message
@@ -117,27 +255,49 @@ class TestSecureMessaging(unittest.TestCase):
         decrypted = self.bob.decrypt_message(encrypted)
         
         self.assertEqual(message, decrypted)
+    
+    def test_conversation(self):
+        """Test several messages in both directions with key rotation."""
+        init_data = self.alice.initiate_session(
+            self.bob.get_public_keys()
+        )
+        self.bob.accept_session(
+            self.alice.get_public_keys(),
+            init_data
+        )
+        
+        for sender, recipient in [(self.alice, self.bob),
+                                  (self.alice, self.bob),
+                                  (self.bob, self.alice)]:
+            message = f"Hello from {sender.user_id}"
+            encrypted = sender.encrypt_message(message)
+            self.assertEqual(recipient.decrypt_message(encrypted), message)
 
 class TestWebAPI(unittest.TestCase):
     """Test suite for the web API example."""
     
-    def setUp(self):
-        """Set up test environment."""
-        self.app = create_app()
-        self.client = self.app.test_client()
-        self.app_context = self.app.app_context()
-        self.app_context.push()
+    @classmethod
+    def setUpClass(cls):
+        """Create one app for the whole suite."""
+        cls.app = create_app()
+        cls.app_context = cls.app.app_context()
+        cls.app_context.push()
     
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up test environment."""
-        self.app_context.pop()
+        # create_app started the shared key pool's refill thread
+        key_pool.stop()
+        cls.app_context.pop()
     
-    def test_user_creation(self):
-        """Test creating a new user."""
-        # Clear existing users
+    def setUp(self):
+        """Start each test with no users or messages."""
         users.clear()
         messages.clear()
-        
+        self.client = self.app.test_client()
+    
+    def test_user_creation(self):
+        """Test creating a new user."""
         response = self.client.post('/api/users', json={
             'user_id': 'alice'
         })
@@ -202,55 +362,17 @@ class TestWebAPI(unittest.TestCase):
         )
         
         self.assertEqual(response.status_code, 401)  # Should fail with mock signature
-
-class TestSecureFileStorage(unittest.TestCase):
-    """Test suite for the secure file storage example."""
-    
-    def setUp(self):
-        """Set up test environment."""
-        self.temp_dir = tempfile.mkdtemp()
-        self.storage = SecureFileStorage(self.temp_dir)
-        
-        # Create test users
-        self.alice_keys = self.storage.create_user("alice")
-        self.bob_keys = self.storage.create_user("bob")
-        
-        # Create test file
-        self.test_file = Path(self.temp_dir) / "test.txt"
-        self.test_content = "This is a test file."
-        self.test_file.write_text(self.test_content)
-    
-    def tearDown(self):
-        """Clean up test environment."""
-        shutil.rmtree(self.temp_dir)
-    
-    def test_file_storage(self):
-        """Test storing and retrieving files."""
-        # Store file
-        metadata = self.storage.store_file("alice", str(self.test_file))
-        
-        # Read file
-        content = self.storage.read_file(metadata.file_id, "alice")
-        self.assertEqual(content.decode(), self.test_content)
-    
-    def test_file_sharing(self):
-        """Test sharing files between users."""
-        # Store and share file
-        metadata = self.storage.store_file("alice", str(self.test_file))
-        self.storage.share_file(metadata.file_id, "alice", "bob")
-        
-        # Bob reads file
-        content = self.storage.read_file(metadata.file_id, "bob")
-        self.assertEqual(content.decode(), self.test_content)
     
-    def test_access_control(self):
-        """Test access control enforcement."""
-        # Store file
-        metadata = self.storage.store_file("alice", str(self.test_file))
+    def test_key_pool(self):
+        """Test that the key pool hands out distinct key sets."""
+        pool = KeyPool(size=4, low_water=2)
+        pool.start()
+        self.addCleanup(pool.stop)
         
-        # Bob shouldn't be able to read
-        with self.assertRaises(ValueError):
-            self.storage.read_file(metadata.file_id, "bob")
+        # More keys than the pool holds, so some are generated inline
+        key_sets = [pool.get() for _ in range(6)]
+        self.assertEqual(len({keys['enc_private_key'] for keys in key_sets}), 6)
+        self.assertEqual(set(key_sets[0]), set(generate_user_keys()))
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -4,9 +4,21 @@ Tests for the Kyber key encapsulation mechanism.
 
 import unittest
 import numpy as np
-from src.kyber import generate_keys, encapsulate, decapsulate, KyberParams, derive_shared_secret
+from src.kyber import (
+    generate_keys,
+    generate_keys_batch,
+    encapsulate,
+    decapsulate,
+    KyberParams,
+    derive_shared_secret
+)
 
 class TestKyber(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Generate the key pairs shared by tests that only use keys."""
+        cls.key_pairs = generate_keys_batch(2, KyberParams())
+    
     def setUp(self):
         """Set up test parameters."""
         self.params = KyberParams()
@@ -32,9 +44,26 @@ class TestKyber(unittest.TestCase):
         self.assertEqual(public_key['t'].shape[0], self.params.k)
         self.assertEqual(private_key['s'].shape[0], self.params.k)
     
+    def test_batch_key_generation(self):
+        """Test generating several independent key pairs at once."""
+        key_pairs = generate_keys_batch(3, self.params)
+        self.assertEqual(len(key_pairs), 3)
+        
+        # Each key pair has its own seed
+        seeds = {private_key['seed'] for _, private_key in key_pairs}
+        self.assertEqual(len(seeds), 3)
+        
+        for public_key, private_key in key_pairs:
+            self.assertEqual(public_key['A'].shape, (self.params.k, self.params.k, self.params.n))
+            self.assertEqual(private_key['s'].shape, (self.params.k, self.params.n))
+            
+            ciphertext, shared_secret_a = encapsulate(public_key, self.params)
+            shared_secret_b = decapsulate(ciphertext, private_key, self.params)
+            self.assertEqual(shared_secret_a, shared_secret_b)
+    
     def test_encapsulation(self):
         """Test secret encapsulation."""
-        public_key, _ = generate_keys(self.params)
+        public_key, _ = self.key_pairs[0]
         ciphertext, shared_secret = encapsulate(public_key, self.params)
         
         # Check that we get a ciphertext and shared secret
@@ -45,7 +74,7 @@ class TestKyber(unittest.TestCase):
     
     def test_decapsulation(self):
         """Test secret decapsulation."""
-        public_key, private_key = generate_keys(self.params)
+        public_key, private_key = self.key_pairs[0]
         ciphertext, shared_secret_a = encapsulate(public_key, self.params)
         shared_secret_b = decapsulate(ciphertext, private_key, self.params)
         
@@ -54,9 +83,9 @@ class TestKyber(unittest.TestCase):
     
     def test_failed_decapsulation(self):
         """Test that decapsulation fails with wrong private key."""
-        # Generate two key pairs
-        public_key1, private_key1 = generate_keys(self.params)
-        _, private_key2 = generate_keys(self.params)
+        # Take two independent key pairs
+        public_key1, private_key1 = self.key_pairs[0]
+        _, private_key2 = self.key_pairs[1]
         
         # Encapsulate with first public key
         ciphertext, shared_secret_a = encapsulate(public_key1, self.params)
@@ -69,7 +98,7 @@ class TestKyber(unittest.TestCase):
     
     def test_key_reuse(self):
         """Test that the same public key can be used multiple times."""
-        public_key, private_key = generate_keys(self.params)
+        public_key, private_key = self.key_pairs[0]
         
         # Perform two encapsulations with the same public key
         ciphertext1, shared_secret1 = encapsulate(public_key, self.params)
@@ -88,7 +117,7 @@ class TestKyber(unittest.TestCase):
     def test_invalid_decapsulation_input(self):
         """Test decapsulation with invalid inputs."""
         # Test with invalid ciphertext
-        _, private_key = generate_keys(self.params)
+        public_key, private_key = self.key_pairs[0]
         invalid_ciphertext = {'invalid': 'ciphertext'}
         shared_secret = decapsulate(invalid_ciphertext, private_key, self.params)
         self.assertEqual(len(shared_secret), 32)  # Should return random secret
@@ -99,7 +128,6 @@ class TestKyber(unittest.TestCase):
         self.assertEqual(len(shared_secret), 32)
         
         # Test with invalid private key
-        public_key, _ = generate_keys(self.params)
         ciphertext, _ = encapsulate(public_key, self.params)
         invalid_private_key = {'invalid': 'key'}
         shared_secret = decapsulate(ciphertext, invalid_private_key, self.params)
@@ -134,17 +162,20 @@ class TestKyber(unittest.TestCase):
     def test_different_security_levels(self):
         """Test Kyber with different security levels."""
         for k in [2, 3, 4]:  # Test all valid k values
-            params = KyberParams(k=k)
-            public_key, private_key = generate_keys(params)
-            
-            # Check matrix dimensions match security level
-            self.assertEqual(public_key['A'].shape[0], k)
-            self.assertEqual(private_key['s'].shape[0], k)
-            
-            # Test encapsulation/decapsulation
-            ciphertext, shared_secret_a = encapsulate(public_key, params)
-            shared_secret_b = decapsulate(ciphertext, private_key, params)
-            self.assertEqual(shared_secret_a, shared_secret_b)
+            # Each level is reported separately, so one failure does not
+            # hide the others
+            with self.subTest(k=k):
+                params = KyberParams(k=k)
+                public_key, private_key = generate_keys(params)
+                
+                # Check matrix dimensions match security level
+                self.assertEqual(public_key['A'].shape[0], k)
+                self.assertEqual(private_key['s'].shape[0], k)
+                
+                # Test encapsulation/decapsulation
+                ciphertext, shared_secret_a = encapsulate(public_key, params)
+                shared_secret_b = decapsulate(ciphertext, private_key, params)
+                self.assertEqual(shared_secret_a, shared_secret_b)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -8,27 +8,53 @@ This test suite verifies:
 4. Error handling and edge cases
 """
 
+import filecmp
+import os
 import unittest
+from unittest import mock
 import tempfile
 import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
 
-from examples.secure_file_storage import SecureFileStorage, FileMetadata
+from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+from examples import secure_file_storage
+from examples.secure_file_storage import (
+    SecureFileStorage, FileMetadata, AEAD_AES_GCM, AEAD_CHACHA20_POLY1305,
+    _ChaCha20Poly1305Stream
+)
 
 class TestSecureFileStorage(unittest.TestCase):
     """Test suite for the SecureFileStorage class."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create the test users' keys once for the whole suite."""
+        cls.users_dir = tempfile.mkdtemp()
+        storage = SecureFileStorage(cls.users_dir)
+        cls.public_keys = {
+            user_id: storage.create_user(user_id)
+            for user_id in ("alice", "bob", "charlie")
+        }
+        cls.users = storage.users
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the directory used to create the users."""
+        shutil.rmtree(cls.users_dir)
+    
     def setUp(self):
         """Set up test environment before each test."""
         # Create temporary directory for storage
         self.temp_dir = tempfile.mkdtemp()
         self.storage = SecureFileStorage(self.temp_dir)
         
-        # Create test users
-        self.alice_keys = self.storage.create_user("alice")
-        self.bob_keys = self.storage.create_user("bob")
-        self.charlie_keys = self.storage.create_user("charlie")
+        # Install the test users; each test gets its own user table, so
+        # users created by one test are not seen by the next
+        self.storage.users = dict(self.users)
+        self.alice_keys = self.public_keys["alice"]
+        self.bob_keys = self.public_keys["bob"]
+        self.charlie_keys = self.public_keys["charlie"]
         
         # Create test file
         self.test_file = Path(self.temp_dir) / "test.txt"
@@ -100,6 +126,61 @@ class TestSecureFileStorage(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.storage.read_file(metadata.file_id, "alice")
     
+    def test_signature_sidecar(self):
+        """Test that the metadata signature is stored and checked as raw bytes."""
+        metadata = self.storage.store_file("alice", str(self.test_file))
+        
+        # Signature is kept next to the metadata, not inside it
+        sig_path = Path(self.temp_dir) / "metadata" / f"{metadata.file_id}.sig"
+        self.assertEqual(sig_path.read_bytes(), metadata.signature)
+        
+        # A corrupted signature is rejected
+        sig_path.write_bytes(bytes(len(metadata.signature)))
+        with self.assertRaises(ValueError):
+            self.storage.read_file(metadata.file_id, "alice")
+    
+    def test_verification_cache(self):
+        """Test that repeated reads skip re-verification but catch changes."""
+        metadata = self.storage.store_file("alice", str(self.test_file))
+        self.storage.read_file(metadata.file_id, "alice")
+        
+        # Changing the stored metadata after it was verified is still caught
+        metadata_path = Path(self.temp_dir) / "metadata" / metadata.file_id
+        metadata_path.write_bytes(
+            metadata_path.read_bytes().replace(b"test.txt", b"evil.txt")
+        )
+        with self.assertRaises(ValueError):
+            self.storage.read_file(metadata.file_id, "alice")
+    
+    def test_list_files(self):
+        """Test listing the files each user can read."""
+        first = self.storage.store_file("alice", str(self.test_file))
+        second = self.storage.store_file("alice", str(self.test_file))
+        bob_file = self.storage.store_file("bob", str(self.test_file))
+        self.storage.share_file(first.file_id, "alice", "charlie")
+        
+        def listed(user_id):
+            return {m.file_id for m in self.storage.list_files(user_id)}
+        
+        self.assertEqual(listed("alice"), {first.file_id, second.file_id})
+        self.assertEqual(listed("bob"), {bob_file.file_id})
+        self.assertEqual(listed("charlie"), {first.file_id})
+        
+        # Listing verifies every record once for later single-file loads
+        self.assertEqual(
+            set(self.storage._load_all_metadata()),
+            {first.file_id, second.file_id, bob_file.file_id}
+        )
+        self.assertIn(bob_file.file_id, self.storage._verified)
+        
+        # Records with a bad signature are left out
+        sig_path = Path(self.temp_dir) / "metadata" / f"{second.file_id}.sig"
+        sig_path.write_bytes(bytes(len(second.signature)))
+        self.assertEqual(listed("alice"), {first.file_id})
+        
+        with self.assertRaises(ValueError):
+            self.storage.list_files("invalid_user")
+    
     def test_access_control(self):
         """Test access control enforcement."""
         # Store file as Alice
@@ -143,12 +224,22 @@ class TestSecureFileStorage(unittest.TestCase):
         # Test metadata serialization
         serialized = metadata.serialize()
         self.assertIsInstance(serialized, bytes)
+        self.assertEqual(FileMetadata.deserialize(serialized, metadata.signature), metadata)
+        with self.assertRaises(ValueError):
+            FileMetadata.deserialize(serialized[:-1])
+        
+        # shared_with is kept sorted, so the encoding does not depend on share order
+        unordered = FileMetadata(
+            metadata.file_id, metadata.owner_id, metadata.filename,
+            metadata.size_bytes, metadata.created_at,
+            metadata.encryption_key_id, ["charlie", "bob"]
+        )
+        self.assertEqual(unordered.shared_with, ["bob", "charlie"])
         
-        # Test metadata verification
-        loaded_metadata = self.storage._load_metadata(metadata.file_id)
-        self.assertEqual(loaded_metadata.file_id, metadata.file_id)
-        self.assertEqual(loaded_metadata.owner_id, metadata.owner_id)
-        self.assertEqual(loaded_metadata.filename, metadata.filename)
+        # The stored metadata is exactly the serialized bytes; loading and
+        # verifying them is covered by the signature and cache tests
+        stored = Path(self.temp_dir) / "metadata" / metadata.file_id
+        self.assertEqual(stored.read_bytes(), serialized)
     
     def test_multiple_shares(self):
         """Test sharing file with multiple users."""
@@ -166,6 +257,23 @@ class TestSecureFileStorage(unittest.TestCase):
         self.assertEqual(bob_content.decode(), self.test_content)
         self.assertEqual(charlie_content.decode(), self.test_content)
     
+    def test_share_with_many(self):
+        """Test sharing a file with several users in one call."""
+        metadata = self.storage.store_file("alice", str(self.test_file))
+        self.storage.share_file(metadata.file_id, "alice", "bob")
+        
+        # Already-shared and repeated recipients are only added once
+        self.storage.share_file_many(metadata.file_id, "alice", ["bob", "charlie", "charlie"])
+        
+        loaded = self.storage._load_metadata(metadata.file_id)
+        self.assertEqual(loaded.shared_with, ["bob", "charlie"])
+        for user_id in ("bob", "charlie"):
+            content = self.storage.read_file(metadata.file_id, user_id)
+            self.assertEqual(content.decode(), self.test_content)
+        
+        with self.assertRaises(ValueError):
+            self.storage.share_file_many(metadata.file_id, "alice", ["bob", "invalid_user"])
+    
     def test_duplicate_share(self):
         """Test sharing file multiple times with same user."""
         # Store and share file
@@ -175,9 +283,10 @@ class TestSecureFileStorage(unittest.TestCase):
         # Share again (should not raise error)
         self.storage.share_file(metadata.file_id, "alice", "bob")
         
-        # Verify Bob can still read
-        content = self.storage.read_file(metadata.file_id, "bob")
-        self.assertEqual(content.decode(), self.test_content)
+        # Bob is listed once; a repeat share returns before touching
+        # any keys, and reading a shared file is covered elsewhere
+        metadata = self.storage._load_metadata(metadata.file_id)
+        self.assertEqual(metadata.shared_with.count("bob"), 1)
     
     def test_large_file(self):
         """Test handling of larger files."""
@@ -186,12 +295,101 @@ class TestSecureFileStorage(unittest.TestCase):
         large_file = Path(self.temp_dir) / "large.bin"
         large_file.write_bytes(large_content)
         
-        # Store and verify
+        # Store, then stream the decrypted copy to disk and compare the
+        # two files chunk by chunk rather than as whole bytes objects
+        metadata = self.storage.store_file("alice", str(large_file))
+        output = Path(self.temp_dir) / "large.out"
+        self.storage.read_file_to(metadata.file_id, "alice", str(output))
+        
+        self.assertEqual(output.stat().st_size, len(large_content))
+        self.assertTrue(filecmp.cmp(large_file, output, shallow=False))
+    
+    def test_chacha20_poly1305_fallback(self):
+        """Test files written with ChaCha20-Poly1305 when AES is not accelerated."""
+        self.storage._aead = AEAD_CHACHA20_POLY1305
+        large_content = bytes(range(256)) * 4097  # spans a chunk boundary
+        large_file = Path(self.temp_dir) / "large.bin"
+        large_file.write_bytes(large_content)
+        metadata = self.storage.store_file("alice", str(large_file))
+        
+        # The algorithm is recorded in the file, so either setting reads it
+        stored = Path(self.temp_dir) / "files" / metadata.file_id
+        self.assertEqual(stored.read_bytes()[0], AEAD_CHACHA20_POLY1305)
+        self.storage._aead = AEAD_AES_GCM
+        self.assertEqual(self.storage.read_file(metadata.file_id, "alice"), large_content)
+        
+        # Tampering is still detected
+        data = bytearray(stored.read_bytes())
+        data[-1] ^= 1
+        stored.write_bytes(bytes(data))
+        with self.assertRaises(ValueError):
+            self.storage.read_file(metadata.file_id, "alice")
+    
+    def test_chacha20_poly1305_stream_matches_aead(self):
+        """Test the streaming ChaCha20-Poly1305 against the one-shot AEAD."""
+        key = os.urandom(32)
+        nonce = os.urandom(12)
+        for length in (0, 1, 63, 64, 1000):
+            with self.subTest(length=length):
+                data = os.urandom(length)
+                expected = ChaCha20Poly1305(key).encrypt(nonce, data, None)
+                
+                # Feed the data in uneven pieces
+                encryptor = _ChaCha20Poly1305Stream(key, nonce, encrypt=True)
+                ciphertext = b''
+                for start in range(0, length, 37):
+                    piece = data[start:start + 37]
+                    buf = bytearray(len(piece) + 15)
+                    written = encryptor.update_into(piece, buf)
+                    ciphertext += bytes(buf[:written])
+                encryptor.finalize()
+                self.assertEqual(ciphertext + encryptor.tag, expected)
+                
+                # Decrypting checks the AEAD's tag
+                decryptor = _ChaCha20Poly1305Stream(
+                    key, nonce, encrypt=False, tag=expected[-16:])
+                buf = bytearray(length + 15)
+                written = decryptor.update_into(expected[:-16], buf)
+                decryptor.finalize()
+                self.assertEqual(bytes(buf[:written]), data)
+    
+    def test_chacha20_poly1305_fallback_warns_once(self):
+        """Test that choosing the ChaCha20-Poly1305 fallback logs one warning."""
+        secure_file_storage._default_aead.cache_clear()
+        self.addCleanup(secure_file_storage._default_aead.cache_clear)
+        with mock.patch.object(secure_file_storage, '_aes_accelerated',
+                               return_value=False):
+            with self.assertLogs(secure_file_storage.logger, 'WARNING') as logs:
+                first = SecureFileStorage(self.temp_dir)
+                second = SecureFileStorage(self.temp_dir)
+        
+        self.assertEqual(first._aead, AEAD_CHACHA20_POLY1305)
+        self.assertEqual(second._aead, AEAD_CHACHA20_POLY1305)
+        self.assertEqual(len(logs.records), 1)
+    
+    def test_read_file_to_path(self):
+        """Test streaming decryption straight to an output file."""
+        large_content = bytes(range(256)) * 8192  # 2MB, spans several chunks
+        large_file = Path(self.temp_dir) / "large.bin"
+        large_file.write_bytes(large_content)
         metadata = self.storage.store_file("alice", str(large_file))
-        content = self.storage.read_file(metadata.file_id, "alice")
         
-        self.assertEqual(len(content), len(large_content))
-        self.assertEqual(content, large_content)
+        output = Path(self.temp_dir) / "out.bin"
+        self.storage.read_file_to(metadata.file_id, "alice", str(output))
+        self.assertEqual(output.read_bytes(), large_content)
+        
+        # Tampered ciphertext is rejected and leaves no output behind
+        stored = Path(self.temp_dir) / "files" / metadata.file_id
+        data = bytearray(stored.read_bytes())
+        data[100] ^= 1
+        stored.write_bytes(bytes(data))
+        tampered_output = Path(self.temp_dir) / "tampered.bin"
+        with self.assertRaises(ValueError):
+            self.storage.read_file_to(metadata.file_id, "alice", str(tampered_output))
+        self.assertFalse(tampered_output.exists())
+        self.assertFalse(Path(str(tampered_output) + ".part").exists())
+        with self.assertRaises(ValueError):
+            self.storage.read_file(metadata.file_id, "alice")
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
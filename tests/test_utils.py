@@ -11,6 +11,7 @@ from src.utils import (
     bits_to_bytes,
     bytes_to_bits,
     generate_matrix,
+    expand_seed,
     find_primitive_root,
     ntt_transform,
     intt_transform,
@@ -30,17 +31,16 @@ class TestUtils(unittest.TestCase):
     
     def test_secure_random_int(self):
         """Test secure random integer generation."""
-        # Test range boundaries
-        for _ in range(100):
-            result = secure_random_int(0, 10)
-            self.assertGreaterEqual(result, 0)
-            self.assertLessEqual(result, 10)
-        
-        # Test negative range
-        for _ in range(100):
-            result = secure_random_int(-5, 5)
-            self.assertGreaterEqual(result, -5)
-            self.assertLessEqual(result, 5)
+        # Test range boundaries, and a negative range
+        for low, high in [(0, 10), (-5, 5)]:
+            with self.subTest(low=low, high=high):
+                samples = np.array([secure_random_int(low, high) for _ in range(100)])
+                self.assertGreaterEqual(samples.min(), low)
+                self.assertLessEqual(samples.max(), high)
+        
+        # A single-value range, and a power-of-two span
+        self.assertEqual(secure_random_int(5, 5), 5)
+        self.assertIn(secure_random_int(8, 9), (8, 9))
     
     def test_constant_time_compare(self):
         """Test constant-time comparison."""
@@ -86,6 +86,17 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(np.all(matrix >= 0))
         self.assertTrue(np.all(matrix < modulus))
     
+    def test_expand_seed(self):
+        """Test deterministic matrix expansion from a seed."""
+        seed = secure_random_bytes(32)
+        matrix = expand_seed(seed, 4, 256, 3329)
+        
+        # Same seed, same matrix; different seed, different matrix
+        self.assertEqual(matrix.shape, (4, 256))
+        np.testing.assert_array_equal(matrix, expand_seed(seed, 4, 256, 3329))
+        self.assertFalse(np.array_equal(matrix, expand_seed(secure_random_bytes(32), 4, 256, 3329)))
+        self.assertTrue(np.all((matrix >= 0) & (matrix < 3329)))
+    
     def test_find_primitive_root(self):
         """Test finding primitive roots."""
         # Test Kyber prime
@@ -130,6 +141,43 @@ class TestUtils(unittest.TestCase):
         # Check elements are in range [0, modulus)
         self.assertTrue(np.all(result >= 0))
         self.assertTrue(np.all(result < modulus))
+    
+    def test_polynomial_multiply_negacyclic(self):
+        """Test multiplication against schoolbook arithmetic modulo x^n + 1."""
+        def schoolbook(a, b, modulus):
+            # Full product with exact Python ints, then x^n folded to -1
+            n = len(a)
+            product = np.convolve(a.astype(object), b.astype(object))
+            result = product[:n].copy()
+            result[:n - 1] -= product[n:]
+            return (result % modulus).astype(np.int64)
+        
+        # Fully split (17, 8380417) and incomplete (3329) transforms,
+        # lengths below 256 for the known Kyber and Dilithium roots, and
+        # a modulus close to the limit of int32 coefficients
+        for modulus, n in [(17, 8), (3329, 256), (8380417, 256),
+                           (3329, 16), (8380417, 16), (40961, 256)]:
+            a = generate_matrix(1, n, modulus)[0]
+            b = generate_matrix(1, n, modulus)[0]
+            np.testing.assert_array_equal(
+                polynomial_multiply(a, b, modulus), schoolbook(a, b, modulus))
+            
+            # Transforms work on stacks of polynomials too
+            stack = generate_matrix(3, n, modulus)
+            np.testing.assert_array_equal(
+                intt_transform(ntt_transform(stack, modulus), modulus), stack)
+    
+    def test_polynomial_multiply_invalid_lengths(self):
+        """Test that unsupported polynomial lengths are rejected."""
+        # Unequal lengths
+        with self.assertRaises(ValueError):
+            polynomial_multiply(np.ones(8, dtype=np.int64),
+                                np.ones(4, dtype=np.int64), 17)
+        
+        # A length that is not a power of 2
+        with self.assertRaises(ValueError):
+            polynomial_multiply(np.ones(6, dtype=np.int64),
+                                np.ones(6, dtype=np.int64), 17)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file